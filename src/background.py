@@ -0,0 +1,265 @@
+# module background
+"""
+Contains the implementation of the BackgroundLibrary class, which loads and saves a library on a
+background event loop so that the CLI never stalls on the disk.
+"""
+
+import os
+import json
+import asyncio
+import threading
+from pathlib import Path
+from functools import wraps
+from contextlib import ExitStack
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine
+
+from book import Book
+from library import Library, write_books
+from snapshot import Snapshot
+
+# Methods which change the library and so can't run while a save takes its copy of the books
+MUTATORS: frozenset[str] = frozenset({"add_book", "add_books", "edit_book", "remove_book",
+                                      "import_file"})
+
+# Methods which a snapshot of the file can answer while the file itself is still loading
+READERS: frozenset[str] = frozenset({"book_by_isbn", "books_by_author", "books_by_title",
+                                     "listing", "search", "search_fuzz", "search_list"})
+
+class LoadError(Exception):
+    """
+    Raised when a library waited on couldn't be loaded.
+    """
+
+class BackgroundLibrary:
+    """
+    A library which is loaded and saved on a background event loop. Any other use of it waits until
+    loading has finished, so the menu is available straight away and only lookups may have to wait.
+    Given a snapshot of the file, lookups, listings, and searches are answered from it meanwhile.
+    """
+
+    def __init__(self, file_path: Path, journal: bool = False, autosave: float | None = None,
+                 snapshot: Snapshot | None = None) -> None:
+        self.library:   Library                   = Library(file_path)
+        self.file_path: Path                      = file_path
+        self.snapshot:  Snapshot | None           = snapshot
+        self.notices:   list[str]                 = []
+        self.saved:     int                       = 0
+        self.loop:      asyncio.AbstractEventLoop = asyncio.new_event_loop()
+
+        # Held while the library changes, so that saves copy the books between changes
+        self.lock: threading.Lock = threading.Lock()
+
+        threading.Thread(target=self.loop.run_forever, name="library-io", daemon=True).start()
+
+        # NOTE: 10/18/26 - only one save runs at a time so an autosave can't swap in an older copy
+        #       after a newer save has finished
+        self.writing: asyncio.Lock = asyncio.Lock()
+
+        self.loading: Future = self.submit(self.load(journal))
+
+        if autosave is not None:
+            self.submit(self.autosave(autosave))
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        """
+        Schedules a coroutine on the background loop and returns a future for its result.
+        """
+
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def wait(self) -> Library:
+        """
+        Returns the library once it has loaded. Raises a LoadError if the file couldn't be decoded.
+        """
+
+        try:
+            self.loading.result()
+        except json.JSONDecodeError as e:
+            raise LoadError(f"Could not decode JSON from file {self.file_path}: {e}") from e
+
+        return self.library
+
+    def preloaded(self) -> bool:
+        """
+        Returns whether reads are still answered from the snapshot while the file loads.
+        """
+
+        return self.snapshot is not None and not self.loading.done()
+
+    def __getattr__(self, name: str) -> Any:
+        # NOTE: 10/18/26 - changes wait for the load, so nothing this session does can make the
+        #       snapshot differ from the file before the library takes over
+        if name in READERS and self.preloaded():
+            return getattr(self.snapshot, name)
+
+        attribute: Any = getattr(self.wait(), name)
+
+        if name not in MUTATORS:
+            return attribute
+
+        @wraps(attribute)
+        def locked(*args, **kwargs) -> Any:
+            with self.lock:
+                return attribute(*args, **kwargs)
+
+        return locked
+
+    def take_notices(self) -> list[str]:
+        """
+        Returns the messages from background work finished since the last call.
+        """
+
+        notices: list[str] = self.notices[:]
+        del self.notices[:len(notices)]
+
+        return notices
+
+    async def load(self, journal: bool) -> None:
+        """
+        Loads the library file, if there is one, and then replays the journal if asked to.
+        """
+
+        if self.file_path.is_file():
+            try:
+                self.notices.append(await asyncio.to_thread(self.library.load_file,
+                                                            self.file_path))
+            except json.JSONDecodeError:
+                if os.stat(self.file_path).st_size != 0:
+                    raise
+
+                self.notices.append(f"Empty file {self.file_path}, continuing.")
+
+        if journal:
+            self.notices.append(await asyncio.to_thread(self.library.open_journal,
+                                                        self.file_path))
+
+        self.saved = self.library.version
+
+    async def save(self, file_path: Path) -> str | None:
+        """
+        Writes a copy of the books to the given file off the event loop. The file is written to a
+        temporary file first and swapped in once complete. Returns None without writing if another
+        session has saved since this one last merged, since its changes have to be merged first.
+        """
+
+        library: Library = self.library
+
+        def write() -> tuple[str | None, int]:
+            # NOTE: 10/18/26 - the file lock is always taken while holding the library lock, as in
+            #       journaled changes, so the two can't deadlock; the library lock is then let go
+            #       so the books can keep changing while the copy is written
+            with ExitStack() as file_lock:
+                with self.lock:
+                    file_lock.enter_context(library.shared())
+
+                    # NOTE: 10/18/26 - searches and listings read the books and indices on the main
+                    #       thread without the lock, so other sessions' changes are never merged
+                    #       here; the save is left for the main thread to merge and retry
+                    if library.stale():
+                        return None, self.saved
+
+                    books:   list[Book] = list(library.books.values())
+                    version: int        = library.version
+
+                message: str = write_books(books, file_path)
+
+                with self.lock:
+                    library.mark_saved(books)
+
+            return message, version
+
+        async with self.writing:
+            message, self.saved = await asyncio.to_thread(write)
+
+            return message
+
+    async def autosave(self, interval: float) -> None:
+        """
+        Saves any changes made since the last save every interval seconds. Libraries with a journal
+        are skipped, since every change is already on disk.
+        """
+
+        await asyncio.wrap_future(self.loading)
+
+        while True:
+            await asyncio.sleep(interval)
+
+            if self.library.journal is not None or self.library.version == self.saved:
+                continue
+
+            # A save skipped because another session saved first is retried on the next interval,
+            # after the main thread has merged its changes before the next prompt
+            try:
+                await self.save(self.file_path)
+            except OSError as e:
+                self.notices.append(f"Autosave to {self.file_path} failed: {e}")
+
+    async def run_locked(self, function: Callable, *args) -> Any:
+        """
+        Runs a function off the event loop while the library can't change, after any running save.
+        """
+
+        def locked() -> Any:
+            with self.lock:
+                return function(*args)
+
+        async with self.writing:
+            return await asyncio.to_thread(locked)
+
+    def refresh(self) -> str | None:
+        """
+        Picks up changes made by other sessions as Library.refresh does, unless the library is still
+        loading, in which case there's nothing to refresh yet.
+        """
+
+        if not self.loading.done():
+            return None
+
+        with self.lock:
+            return self.wait().refresh()
+
+    def update_file(self, file_path: Path, compact: bool = False) -> str:
+        """
+        Saves the library as Library.update_file does, but writes the file on the background loop.
+        Waits for the save to finish.
+        """
+
+        library: Library = self.wait()
+
+        if library.journal is None:
+            message: str | None
+
+            # Other sessions' saves are merged here on the calling thread, and the save retried in
+            # case another lands in between
+            while (message := self.submit(self.save(file_path)).result()) is None:
+                self.refresh()
+
+            return message
+
+        # Compacting truncates the journal too, so it runs as a whole while nothing else changes;
+        # the caller waits for it, so nothing reads the books while other sessions' changes merge
+        return self.submit(self.run_locked(library.update_file, file_path, compact)).result()
+
+    async def shutdown(self) -> None:
+        """
+        Cancels the work left on the event loop, such as autosaving, and waits for it to stop.
+        """
+
+        tasks: set[asyncio.Task] = asyncio.all_tasks() - {asyncio.current_task()}
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self) -> None:
+        """
+        Stops autosaving and the background loop, and unmaps the snapshot.
+        """
+
+        self.submit(self.shutdown()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+        if self.snapshot is not None:
+            self.snapshot.close()
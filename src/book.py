@@ -3,9 +3,13 @@
 Contains the implementation of the Book class.
 """
 
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, fields
 
-@dataclass
+# NOTE: 10/18/26 - every missing value refers to this one string object instead of a copy per book
+MISSING: str = sys.intern("-")
+
+@dataclass(slots=True)
 class Book:
     """
     A book.
@@ -15,12 +19,37 @@ class Book:
     author:    str
     isbn:      str
 
-    category:   str = "-"
-    cover:      str = "-"
-    edition:    str = "-"
-    editor:     str = "-"
-    pages:      str = "-"
-    publisher:  str = "-"
-    translator: str = "-"
-    volume:     str = "-"
-    year:       str = "-"
+    category:   str = MISSING
+    cover:      str = MISSING
+    edition:    str = MISSING
+    editor:     str = MISSING
+    pages:      str = MISSING
+    publisher:  str = MISSING
+    translator: str = MISSING
+    volume:     str = MISSING
+    year:       str = MISSING
+
+    def __post_init__(self) -> None:
+        # Fields which repeat across many books are interned so equal values share one string;
+        # titles and ISBNs are almost always unique and are left as-is
+        intern = sys.intern
+
+        self.author     = intern(self.author)
+        self.category   = intern(self.category)
+        self.cover      = intern(self.cover)
+        self.edition    = intern(self.edition)
+        self.editor     = intern(self.editor)
+        self.pages      = intern(self.pages)
+        self.publisher  = intern(self.publisher)
+        self.translator = intern(self.translator)
+        self.volume     = intern(self.volume)
+        self.year       = intern(self.year)
+
+    def to_dict(self) -> dict[str, str]:
+        """
+        Returns the fields of the book as a dictionary, equivalent to vars() on a regular class.
+        """
+
+        return {name: getattr(self, name) for name in FIELDS}
+
+FIELDS: tuple[str, ...] = tuple(field.name for field in fields(Book))
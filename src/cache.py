@@ -0,0 +1,111 @@
+# module cache
+"""
+Contains the implementation of the QueryCache class.
+"""
+
+from collections import OrderedDict
+
+CACHE_CAPACITY: int = 32
+
+class QueryCache:
+    """
+    A least recently used cache of search results keyed by query and search mode. Each result maps
+    the ID of every matching book to its score.
+    """
+
+    def __init__(self, capacity: int = CACHE_CAPACITY) -> None:
+        self.capacity:    int                                           = capacity
+        self.entries:     OrderedDict[tuple[str, str], dict[int, int]] = OrderedDict()
+        self.version:     int                                           = 0
+        self.hits:        int                                           = 0
+        self.misses:      int                                           = 0
+        self.refinements: int                                           = 0
+
+    def sync(self, version: int) -> None:
+        """
+        Drops every entry if the library has changed since they were cached.
+        """
+
+        if version != self.version:
+            self.entries.clear()
+            self.version = version
+
+    def get(self, query: str, mode: str) -> dict[int, int] | None:
+        """
+        Returns the cached results of the query, marking them as the most recently used.
+        """
+
+        results: dict[int, int] | None = self.entries.get((query, mode))
+
+        if results is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end((query, mode))
+
+        return results
+
+    def closest(self, query: str, mode: str, max_size: int | None = None) -> dict[int, int] | None:
+        """
+        Returns the cached results of the longest query the given one extends, if any, unless there
+        are more than max_size of them. Every match of the longer query is among these results, so
+        only these books need to be scanned again.
+        """
+
+        # NOTE: 10/18/26 - this holds for substring and subsequence matching alike: anything
+        #       containing the query also contains each of its prefixes; the longest cached prefix
+        #       has the fewest results
+        for end in range(len(query) - 1, 0, -1):
+            results: dict[int, int] | None = self.entries.get((query[:end], mode))
+
+            if results is None:
+                continue
+
+            if max_size is not None and len(results) > max_size:
+                return None
+
+            self.refinements += 1
+            self.entries.move_to_end((query[:end], mode))
+
+            return results
+
+        return None
+
+    def put(self, query: str, mode: str, results: dict[int, int]) -> None:
+        """
+        Caches the results of the query, evicting the least recently used entry if full.
+        """
+
+        self.entries[(query, mode)] = results
+        self.entries.move_to_end((query, mode))
+
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Drops every entry.
+        """
+
+        self.entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Returns the fraction of lookups answered entirely from the cache.
+        """
+
+        lookups: int = self.hits + self.misses
+
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        Returns the hit rate and size of the cache.
+        """
+
+        return {"hits": self.hits, "misses": self.misses, "refinements": self.refinements,
+                "hit_rate": self.hit_rate, "entries": len(self.entries),
+                "capacity": self.capacity,
+                "cached_ids": sum(len(results) for results in self.entries.values())}
@@ -0,0 +1,332 @@
+# module client
+"""
+Contains the LibraryClient class, which uses a library hosted by the library server in place of an
+in-process one.
+"""
+
+import json
+import socket
+import builtins
+import threading
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator
+
+from book import Book
+from report import ImportReport
+from results import LazyResults
+
+# Idle connections kept open for reuse; more may be open at once, but extras are closed after use
+POOL_SIZE: int = 4
+
+# Books fetched per request when paging through a listing, several screens' worth
+FETCH_SIZE: int = 100
+
+class ServerError(Exception):
+    """
+    Raised when the server fails a request with an error which isn't a built-in exception.
+    """
+
+class Connection:
+    """
+    One connection to the server. Requests are numbered so that responses can be matched to them.
+    """
+
+    def __init__(self, socket_path: Path) -> None:
+        self.socket: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(str(socket_path))
+
+        self.reader:  BinaryIO = self.socket.makefile('rb')
+        self.next_id: int      = 0
+
+    def send(self, method: str, args: tuple) -> int:
+        """
+        Sends a request without waiting for the response, and returns its ID.
+        """
+
+        request_id: int = self.next_id
+        self.next_id += 1
+
+        request: dict = {"id": request_id, "method": method, "args": args}
+        self.socket.sendall(json.dumps(request, ensure_ascii=False).encode() + b'\n')
+
+        return request_id
+
+    def receive(self, request_id: int) -> Any:
+        """
+        Returns the result of the next response, which must be for the given request. Raises the
+        error the request failed with, as a built-in exception where possible.
+        """
+
+        line: bytes = self.reader.readline()
+
+        if not line:
+            raise ConnectionError("The library server closed the connection.")
+
+        response: dict = json.loads(line)
+
+        if response["id"] != request_id:
+            raise ConnectionError(f"Expected a response to request {request_id}, got one to "
+                                  f"{response['id']}.")
+
+        if "error" in response:
+            error: Any = getattr(builtins, response["type"], None)
+
+            if isinstance(error, type) and issubclass(error, Exception):
+                raise error(response["error"])
+
+            raise ServerError(f"{response['type']}: {response['error']}")
+
+        return response["result"]
+
+    def close(self) -> None:
+        """
+        Closes the connection.
+        """
+
+        self.reader.close()
+        self.socket.close()
+
+class LibraryClient:
+    """
+    A library hosted by the library server, with the same interface as the in-process one.
+    Connections are pooled, so each request after the first costs a round trip rather than a
+    connect, and several requests can be pipelined over one connection.
+    """
+
+    def __init__(self, socket_path: Path) -> None:
+        self.socket_path: Path             = socket_path
+        self.idle:        list[Connection] = []
+        self.lock:        threading.Lock   = threading.Lock()
+
+        # Connecting straight away raises an OSError if no server is listening
+        self.release(Connection(socket_path))
+
+    def acquire(self) -> Connection:
+        """
+        Returns an idle connection, or a new one if there are none.
+        """
+
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+
+        return Connection(self.socket_path)
+
+    def release(self, connection: Connection) -> None:
+        """
+        Returns a connection to the pool, closing it if the pool is full.
+        """
+
+        with self.lock:
+            if len(self.idle) < POOL_SIZE:
+                self.idle.append(connection)
+                return
+
+        connection.close()
+
+    def pipeline(self, *calls: tuple) -> list[Any]:
+        """
+        Sends several requests, each a method name followed by its arguments, before reading any of
+        the responses, and returns their results in order. Costs one round trip in total.
+        """
+
+        connection: Connection = self.acquire()
+
+        try:
+            request_ids: list[int] = [connection.send(method, args) for method, *args in calls]
+            results:     list[Any] = []
+            error:       Exception | None = None
+
+            # Every response is read, even after an error, so the connection can be reused
+            for request_id in request_ids:
+                try:
+                    results.append(connection.receive(request_id))
+                except ConnectionError:
+                    raise
+                except Exception as e:
+                    error = error or e
+        except (OSError, ValueError):
+            # A connection in an unknown state can't be reused
+            connection.close()
+            raise
+
+        self.release(connection)
+
+        if error is not None:
+            raise error
+
+        return results
+
+    def call(self, method: str, *args) -> Any:
+        """
+        Sends one request and returns its result.
+        """
+
+        return self.pipeline((method, *args))[0]
+
+    def close(self) -> None:
+        """
+        Closes every idle connection.
+        """
+
+        with self.lock:
+            for connection in self.idle:
+                connection.close()
+
+            self.idle.clear()
+
+    def __len__(self) -> int:
+        return self.call("count")
+
+    def book_by_isbn(self, isbn: str) -> Book | None:
+        """
+        Returns the book with the given ISBN.
+        """
+
+        data: dict | None = self.call("book_by_isbn", isbn)
+
+        return None if data is None else Book(**data)
+
+    def books_by_title(self, title: str) -> list[Book]:
+        """
+        Returns a list of books with the given title.
+        """
+
+        return [Book(**data) for data in self.call("books_by_title", title)]
+
+    def books_by_author(self, author: str) -> list[Book]:
+        """
+        Returns a list of books with the given author.
+        """
+
+        return [Book(**data) for data in self.call("books_by_author", author)]
+
+    def add_book(self, book: Book) -> None:
+        """
+        Adds a book to the library.
+        """
+
+        self.call("add_book", book.to_dict())
+
+    def edit_book(self, old_book: Book, new_book: Book) -> None:
+        """
+        Replaces the old book with the new one.
+        """
+
+        self.call("edit_book", old_book.isbn, new_book.to_dict())
+
+    def remove_book(self, book: Book) -> None:
+        """
+        Removes a book from the library.
+        """
+
+        self.call("remove_book", book.isbn)
+
+    def search_list(self, query: str) -> list[Book]:
+        """
+        Returns a list of books matching the query, searched by a linear scan on the server.
+        """
+
+        return [Book(**data) for data in self.call("search_list", query)]
+
+    def search_dict(self, query: str) -> list[Book]:
+        """
+        Returns a list of books matching the query, searched through the dictionaries on the server.
+        """
+
+        return [Book(**data) for data in self.call("search_dict", query)]
+
+    def search_trigram(self, query: str) -> list[Book]:
+        """
+        Returns a list of books matching the query, searched through the trigram index on the
+        server.
+        """
+
+        return [Book(**data) for data in self.call("search_trigram", query)]
+
+    def search_fuzz(self, query: str, limit: int | None = None) -> list[Book]:
+        """
+        Returns a list of books matching the query using fuzzy finding, best matches first.
+        """
+
+        return [Book(**data) for data in self.call("search_fuzz", query, limit)]
+
+    def search(self, query: str, backend: str = "fuzz", limit: int | None = None) -> list[Book]:
+        """
+        Returns the books matching the query with the given backend, served from the server's cache
+        where possible.
+        """
+
+        return [Book(**data) for data in self.call("search", query, backend, limit)]
+
+    def query(self, query: str) -> list[Book]:
+        """
+        Returns a list of books matching every term of a field query.
+        """
+
+        return [Book(**data) for data in self.call("query", query)]
+
+    def paged(self, source: str, *args) -> LazyResults:
+        """
+        Returns a listing from the server, fetching books a page at a time as they are shown.
+        """
+
+        first: dict = self.call("page", source, args, 0, FETCH_SIZE)
+
+        def books() -> Iterator[Book]:
+            page:  dict = first
+            start: int  = 0
+
+            while True:
+                yield from (Book(**data) for data in page["books"])
+
+                if len(page["books"]) < FETCH_SIZE:
+                    return
+
+                start += FETCH_SIZE
+                page   = self.call("page", source, args, start, start + FETCH_SIZE)
+
+        return LazyResults(books(), first["length"])
+
+    def listing(self) -> LazyResults:
+        """
+        Returns every book in the order added.
+        """
+
+        return self.paged("listing")
+
+    def sorted_books(self, name: str, reverse: bool = False) -> LazyResults:
+        """
+        Returns every book ordered by a field, with the books missing it at the end.
+        """
+
+        return self.paged("sorted_books", name, reverse)
+
+    def books_in_range(self, name: str, low: int | str | None, high: int | str | None,
+                       reverse: bool = False) -> LazyResults:
+        """
+        Returns the books with a value for a field between low and high inclusive, in order.
+        """
+
+        return self.paged("books_in_range", name, low, high, reverse)
+
+    def books_with_prefix(self, name: str, prefix: str, reverse: bool = False) -> LazyResults:
+        """
+        Returns the books with a value for a field starting with the prefix, in order.
+        """
+
+        return self.paged("books_with_prefix", name, prefix, reverse)
+
+    def import_file(self, file_path: Path, progress: None = None) -> ImportReport:
+        """
+        Bulk imports a CSV, JSON, or JSON Lines file into the library on the server.
+        """
+
+        return ImportReport(**self.call("import_file", str(file_path.resolve())))
+
+    def update_file(self, file_path: Path) -> str:
+        """
+        Asks the server to save the library to the given file.
+        """
+
+        return self.call("update_file", str(file_path.resolve()))
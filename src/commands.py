@@ -0,0 +1,192 @@
+# module commands
+"""
+Contains the non-interactive commands, such as `python main.py lookup <isbn>` and
+`python main.py search <query>`, which answer one question and exit. They import only what the
+answer needs, so none of rich, the in-memory indices, or the event loop are loaded.
+"""
+
+import sys
+import argparse
+from pathlib import Path
+from typing import Iterator, Protocol
+
+from book import Book, FIELDS
+
+# Results printed by a search unless --limit says otherwise
+SEARCH_LIMIT: int = 10
+
+class Source(Protocol):
+    """
+    Anything the commands can answer from: a snapshot, a database, a server, or a library.
+    """
+
+    def book_by_isbn(self, isbn: str) -> Book | None: ...
+
+    def search_fuzz(self, query: str, limit: int | None = None) -> list[Book]: ...
+
+class FileBooks:
+    """
+    Answers the commands by streaming the library file, for when there's no snapshot to map. A
+    lookup stops reading as soon as the book is found, and nothing is indexed.
+    """
+
+    def __init__(self, file_path: Path) -> None:
+        self.file_path: Path = file_path
+
+    def __iter__(self) -> Iterator[Book]:
+        from stream import iter_records
+
+        return (Book(**record) for record in iter_records(self.file_path))
+
+    def book_by_isbn(self, isbn: str) -> Book | None:
+        """
+        Returns the first book with the given ISBN.
+        """
+
+        return next((book for book in self if book.isbn == isbn), None)
+
+    def search_fuzz(self, query: str, limit: int | None = None) -> list[Book]:
+        """
+        Returns a list of books matching the query, ranked by score, using fuzzy finding.
+        """
+
+        from fuzzy import score, top_k
+        from normalize import normalize_key, query_forms
+
+        # Keys and query are normalized as the library's fuzzy index does, so "cafe" finds "Café"
+        normalized:  str            = query_forms(query)[-1]
+        books:       list[Book]     = []
+        best_scores: dict[int, int] = {}
+
+        # Same scoring as a snapshot, but only the matching books are kept
+        for book in self:
+            key_scores: list[int] = [key_score for key in (book.title, book.author, book.isbn)
+                                     if (key_score := score(normalized, normalize_key(key)))
+                                     is not None]
+
+            if key_scores:
+                best_scores[len(books)] = max(key_scores)
+                books.append(book)
+
+        return [books[i] for i in top_k(best_scores, limit)]
+
+def open_source(file_path: Path) -> Source:
+    """
+    Returns the cheapest source that is up to date with the library file, checked in the same order
+    as the interactive CLI: a running server, then a database, then the file itself.
+    """
+
+    socket_path:   Path = file_path.with_suffix(".sock")
+    db_path:       Path = file_path.with_suffix(".db")
+    journal_path:  Path = file_path.with_suffix(".journal")
+    snapshot_path: Path = file_path.with_suffix(".snap")
+
+    if socket_path.exists():
+        from client import LibraryClient
+
+        try:
+            return LibraryClient(socket_path)
+        except (AttributeError, OSError):
+            # Unix sockets aren't supported, or the server didn't shut down cleanly
+            pass
+
+    if db_path.is_file():
+        from database import DatabaseLibrary
+
+        return DatabaseLibrary(db_path)
+
+    # NOTE: 10/18/26 - changes still in the journal aren't in the file or any snapshot of it, so
+    #       they can only be seen by loading the library and replaying them
+    if journal_path.is_file():
+        from journal import Journal
+        from library import Library
+
+        library: Library = Library(file_path)
+
+        # Replaying may truncate a torn final entry, so the lock is held, as by any session opening
+        # the journal, to keep that from cutting off an entry another session is appending
+        with library.shared():
+            if file_path.is_file() and file_path.stat().st_size > 0:
+                library.load_file(file_path)
+
+            for entry in Journal(journal_path).replay():
+                library.apply_entry(entry)
+
+        return library
+
+    # A snapshot is only used if it was converted after the file was last saved
+    if snapshot_path.is_file() and (not file_path.is_file() or
+                                    snapshot_path.stat().st_mtime_ns >=
+                                    file_path.stat().st_mtime_ns):
+        from snapshot import Snapshot
+
+        return Snapshot(snapshot_path)
+
+    if not file_path.is_file():
+        raise FileNotFoundError(f"The {file_path} file could not be located.")
+
+    return FileBooks(file_path)
+
+def print_books(books: list[Book]) -> None:
+    """
+    Prints one book per line with its fields separated by tabs, in the order of Book's fields.
+    """
+
+    for book in books:
+        print("\t".join(getattr(book, name) for name in FIELDS))
+
+def main(arguments: list[str], file_path: Path) -> int:
+    """
+    Runs the command given on the command line and returns the exit status: 0 if any books were
+    found, 1 if none were, and 2 if the command couldn't be run.
+    """
+
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog="main.py", description="Looks up or searches the library without the interactive CLI.")
+    parser.add_argument("--file", type=Path, default=file_path, help="library file to read")
+
+    subparsers: argparse._SubParsersAction = parser.add_subparsers(dest="command", required=True)
+
+    lookup: argparse.ArgumentParser = subparsers.add_parser("lookup", help="find a book by ISBN")
+    lookup.add_argument("isbn")
+
+    search: argparse.ArgumentParser = subparsers.add_parser("search", help="fuzzy search titles, "
+                                                            "authors, and ISBNs")
+    search.add_argument("query", nargs='+')
+    search.add_argument("--limit", type=int, default=SEARCH_LIMIT, help="most books to print")
+
+    args: argparse.Namespace = parser.parse_args(arguments)
+
+    try:
+        source: Source = open_source(args.file)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    except TypeError as e:
+        print(f"ERROR: malformed book record in {args.file}: {e}", file=sys.stderr)
+        return 2
+
+    # Streamed files are only decoded as they're read, so a malformed one fails here rather than
+    # when the source is opened
+    try:
+        match args.command:
+            case "lookup":
+                book:  Book | None = source.book_by_isbn(args.isbn)
+                books: list[Book]  = [] if book is None else [book]
+            case "search":
+                books: list[Book] = source.search_fuzz(" ".join(args.query), args.limit)
+    except (ValueError, OSError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    # A record with an unknown or missing field, or a value which isn't a string, can't be made
+    # into a Book; exit status 1 is kept for finding no books
+    except TypeError as e:
+        print(f"ERROR: malformed book record in {args.file}: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if hasattr(source, "close"):
+            source.close()
+
+    print_books(books)
+
+    return 0 if books else 1
@@ -4,41 +4,78 @@ Contains functions for converting from CSV to JSON and vice versa.
 """
 
 import csv
-import json
 from pathlib import Path
+from typing import Iterator
+
+from book import Book, FIELDS, MISSING
+from stream import CHUNK_SIZE, iter_csv, iter_records, write_json_array
 
 def json_to_csv(file_path_csv: Path, file_path_json: Path) -> None:
     """
-    Writes to a new CSV file with the specified name given a JSON file with the same name.
+    Writes to a new CSV file with the specified name given a JSON file with the same name. Records
+    are streamed one at a time.
     """
 
     try:
-        with open(file_path_json, mode='r', encoding="utf-8") as json_file:
-            json_data: list[dict] = json.load(json_file)
+        records: Iterator[dict] = iter_records(file_path_json)
 
-        with open(file_path_csv, mode='w', encoding="utf-8", newline='') as csv_file:
+        with open(file_path_csv, mode='w', encoding="utf-8", newline='',
+                  buffering=CHUNK_SIZE) as csv_file:
             csv_writer = csv.writer(csv_file)
 
-            csv_writer.writerow(json_data[0].keys())
+            csv_writer.writerow(FIELDS)
 
-            for item in json_data:
-                csv_writer.writerow(item.values())
+            for record in records:
+                csv_writer.writerow([record.get(name, MISSING) for name in FIELDS])
 
     except FileNotFoundError as e:
         raise e
 
 def csv_to_json(file_path_csv: Path, file_path_json: Path) -> None:
     """
-    Writes to a new JSON file with the specified name given a CSV file with the same name.
+    Writes to a new JSON file with the specified name given a CSV file with the same name. Rows are
+    streamed one at a time.
+    """
+
+    write_json_array(iter_csv(file_path_csv), file_path_json)
+
+def json_to_db(file_path_db: Path, file_path_json: Path) -> None:
+    """
+    Writes to a new SQLite database with the specified name given a JSON file with the same name.
+    """
+
+    from database import DatabaseLibrary
+
+    if not file_path_json.is_file():
+        raise FileNotFoundError(file_path_json)
+
+    library: DatabaseLibrary = DatabaseLibrary(file_path_db)
+
+    try:
+        library.load_file(file_path_json)
+    finally:
+        library.close()
+
+def json_to_snapshot(file_path_snapshot: Path, file_path_json: Path) -> None:
+    """
+    Writes to a new binary snapshot with the specified name given a JSON file with the same name.
     """
 
-    json_data: list[dict] = []
+    from snapshot import write_snapshot
 
-    with open(file_path_csv, mode='r', encoding="utf-8") as csv_file:
-        csv_data: csv.DictReader = csv.DictReader(csv_file)
+    write_snapshot((Book(**book_data) for book_data in iter_records(file_path_json)),
+                   file_path_snapshot)
 
-        for row in csv_data:
-            json_data.append(row)
+def snapshot_to_json(file_path_snapshot: Path, file_path_json: Path) -> None:
+    """
+    Writes to a new JSON file with the specified name given a binary snapshot with the same name.
+    """
+
+    from snapshot import Snapshot
 
-    with open(file_path_json, mode='w', encoding="utf-8") as json_file:
-        json.dump(json_data, json_file, indent=4)
+    snapshot: Snapshot = Snapshot(file_path_snapshot)
+
+    try:
+        write_json_array((book.to_dict() for book in snapshot), file_path_json)
+    finally:
+        snapshot.close()
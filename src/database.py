@@ -0,0 +1,477 @@
+# module database
+"""
+Contains the implementation of the DatabaseLibrary class.
+"""
+
+import sqlite3
+from pathlib import Path
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Mapping
+
+from book import Book, FIELDS, MISSING
+from fuzzy import score, top_k
+from indexes import NUMERIC_FIELDS
+from instrument import timed
+from normalize import fold, normalize_key
+from query import DEFAULT_FIELDS, parse
+from report import ImportReport
+from results import LazyResults
+from stream import iter_csv, iter_records
+
+COLUMNS:      str = ", ".join(FIELDS)
+PLACEHOLDERS: str = ", ".join('?' * len(FIELDS))
+INSERT:       str = f"INSERT INTO books ({COLUMNS}) VALUES ({PLACEHOLDERS})"
+
+BATCH_SIZE: int = 500
+
+# Rows fetched per query when reading the whole table, several screens' worth of a listing
+PAGE_SIZE: int = 100
+
+# Range queries compare numeric fields as integers, so that is what gets indexed
+NUMERIC_INDEXES: str = "".join(f"CREATE INDEX IF NOT EXISTS books_{name} "
+                               f"ON books (CAST({name} AS INTEGER));\n"
+                               for name in NUMERIC_FIELDS)
+
+SCHEMA: str = f"""
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    {", ".join(name + " TEXT NOT NULL" for name in FIELDS)},
+    UNIQUE (isbn)
+);
+CREATE INDEX IF NOT EXISTS books_title  ON books (title);
+CREATE INDEX IF NOT EXISTS books_author ON books (author);
+{NUMERIC_INDEXES}"""
+
+FTS_TABLE: str = """
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5 (
+    title, author, isbn, content='books', content_rowid='id', tokenize='trigram'
+)
+"""
+
+FTS_INSERT_TRIGGER: str = """
+CREATE TRIGGER IF NOT EXISTS books_insert AFTER INSERT ON books BEGIN
+    INSERT INTO books_fts (rowid, title, author, isbn)
+    VALUES (new.id, new.title, new.author, new.isbn);
+END
+"""
+
+FTS_DELETE_TRIGGER: str = """
+CREATE TRIGGER IF NOT EXISTS books_delete AFTER DELETE ON books BEGIN
+    INSERT INTO books_fts (books_fts, rowid, title, author, isbn)
+    VALUES ('delete', old.id, old.title, old.author, old.isbn);
+END
+"""
+
+def escape_like(query: str) -> str:
+    """
+    Returns the query with the LIKE wildcards escaped using a backslash.
+    """
+
+    return query.replace("\\", "\\\\").replace('%', "\\%").replace('_', "\\_")
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """
+    Yields successive lists of at most size items.
+    """
+
+    iterator: Iterator = iter(items)
+
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+class BookTable(Mapping[int, Book]):
+    """
+    A read-only mapping from book IDs to the books in the database, which reads rows only as they
+    are needed instead of loading the whole table.
+    """
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection: sqlite3.Connection = connection
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+    def __getitem__(self, book_id: int) -> Book:
+        row: tuple | None = self.connection.execute(f"SELECT {COLUMNS} FROM books WHERE id = ?",
+                                                    (book_id,)).fetchone()
+
+        if row is None:
+            raise KeyError(book_id)
+
+        return Book(*row)
+
+    def __iter__(self) -> Iterator[int]:
+        return (book_id for book_id, _ in self.items())
+
+    def items(self) -> Iterator[tuple[int, Book]]:
+        """
+        Yields every book with its ID in the order added, a page at a time.
+        """
+
+        # NOTE: 10/18/26 - each page is its own query starting after the last ID seen, so no cursor
+        #       is left open between pages and changes made while paging never invalidate one;
+        #       the primary key makes every page an index seek rather than an OFFSET scan
+        last_id: int = 0
+
+        while True:
+            rows: list[tuple] = self.connection.execute(
+                f"SELECT id, {COLUMNS} FROM books WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, PAGE_SIZE)).fetchall()
+
+            yield from ((row[0], Book(*row[1:])) for row in rows)
+
+            if len(rows) < PAGE_SIZE:
+                return
+
+            last_id = rows[-1][0]
+
+    def values(self) -> Iterator[Book]:
+        """
+        Yields every book in the order added, a page at a time.
+        """
+
+        return (book for _, book in self.items())
+
+class DatabaseLibrary:
+    """
+    A library stored in an SQLite database.
+    """
+
+    def __init__(self, file_path: Path) -> None:
+        self.file_path:  Path               = file_path
+        self.connection: sqlite3.Connection = sqlite3.connect(file_path)
+
+        self.connection.executescript(SCHEMA)
+
+        # Field queries compare values normalized as the in-memory library does
+        self.connection.create_function("fold", 1, fold, deterministic=True)
+        self.connection.create_function("normalize_key", 1, normalize_key, deterministic=True)
+
+        # NOTE: 10/18/26 - FTS5 (and its trigram tokenizer) is an optional SQLite extension, so text
+        #       searches fall back to LIKE scans when it isn't compiled in
+        try:
+            for statement in (FTS_TABLE, FTS_INSERT_TRIGGER, FTS_DELETE_TRIGGER):
+                self.connection.execute(statement)
+
+            self.has_fts: bool = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+
+        self.connection.commit()
+
+    def __len__(self) -> int:
+        return len(self.books)
+
+    @property
+    def books(self) -> BookTable:
+        """
+        Returns every book in the database keyed by its ID, read from the table as accessed.
+        """
+
+        return BookTable(self.connection)
+
+    def listing(self) -> LazyResults:
+        """
+        Returns every book in the order added, reading only the pages which are shown.
+        """
+
+        return LazyResults(self.books.values(), len(self))
+
+    def select(self, where: str, parameters: tuple = ()) -> list[Book]:
+        """
+        Returns a list of books matching the given WHERE clause in insertion order.
+        """
+
+        rows = self.connection.execute(f"SELECT {COLUMNS} FROM books WHERE {where} "
+                                       "ORDER BY id", parameters)
+
+        return [Book(*row) for row in rows]
+
+    @timed
+    def add_book(self, book: Book) -> None:
+        """
+        Inserts a book into the database.
+        """
+
+        # NOTE: 05/30/24 - only called if the book doesn't exist; enforced in main.py
+
+        with self.connection:
+            self.connection.execute(INSERT, tuple(getattr(book, name) for name in FIELDS))
+
+    @timed
+    def edit_book(self, old_book: Book, new_book: Book) -> None:
+        """
+        Removes the old book and adds the new one in a single transaction.
+        """
+
+        with self.connection:
+            self.connection.execute("DELETE FROM books WHERE isbn = ?", (old_book.isbn,))
+            self.connection.execute(INSERT, tuple(getattr(new_book, name) for name in FIELDS))
+
+    @timed
+    def remove_book(self, book: Book) -> None:
+        """
+        Deletes a book from the database.
+        """
+
+        with self.connection:
+            self.connection.execute("DELETE FROM books WHERE isbn = ?", (book.isbn,))
+
+    def books_by_title(self, title: str) -> list[Book]:
+        """
+        Returns a list of books with the given title.
+        """
+
+        return self.select("title = ?", (title,))
+
+    def books_by_author(self, author: str) -> list[Book]:
+        """
+        Returns a list of books with the given author.
+        """
+
+        return self.select("author = ?", (author,))
+
+    def book_by_isbn(self, isbn: str) -> Book | None:
+        """
+        Returns the book with the given ISBN.
+        """
+
+        books: list[Book] = self.select("isbn = ?", (isbn,))
+
+        return books[0] if books else None
+
+    @timed
+    def search_list(self, query: str) -> list[Book]:
+        """
+        Returns a list of books matching the query. Scans the table using LIKE.
+        """
+
+        pattern: str = f"%{escape_like(query)}%"
+
+        return self.select("title LIKE ?1 ESCAPE '\\' OR author LIKE ?1 ESCAPE '\\' "
+                           "OR isbn LIKE ?1 ESCAPE '\\'", (pattern,))
+
+    @timed
+    def search_dict(self, query: str) -> list[Book]:
+        """
+        Returns a list of books matching the query. Searches the full-text index when possible.
+        """
+
+        # The trigram tokenizer can't match queries shorter than three characters
+        if not self.has_fts or len(query) < 3:
+            return self.search_list(query)
+
+        phrase: str = '"' + query.replace('"', '""') + '"'
+
+        return self.select("id IN (SELECT rowid FROM books_fts WHERE books_fts MATCH ?)",
+                           (phrase,))
+
+    @timed
+    def search_trigram(self, query: str) -> list[Book]:
+        """
+        Returns a list of books matching the query. The full-text index is already trigram-based.
+        """
+
+        return self.search_dict(query)
+
+    @timed
+    def search_fuzz(self, query: str, limit: int | None = None) -> list[Book]:
+        """
+        Returns a list of books matching the query, ranked by score. Prefilters the table using
+        LIKE and scores the remaining rows using fuzzy finding.
+        """
+
+        pattern: str = '%' + '%'.join(escape_like(char) for char in query) + '%'
+        lowered: str = query.lower()
+
+        rows = self.connection.execute(f"SELECT id, {COLUMNS} FROM books "
+                                       "WHERE title LIKE ?1 ESCAPE '\\' OR author LIKE ?1 "
+                                       "ESCAPE '\\' OR isbn LIKE ?1 ESCAPE '\\'", (pattern,))
+
+        candidates:  dict[int, Book] = {}
+        best_scores: dict[int, int]  = {}
+
+        for row in rows:
+            book: Book = Book(*row[1:])
+
+            key_scores: list[int] = [key_score for key in (book.title, book.author, book.isbn)
+                                     if (key_score := score(lowered, key.lower())) is not None]
+
+            if key_scores:
+                candidates[row[0]]  = book
+                best_scores[row[0]] = max(key_scores)
+
+        return [candidates[i] for i in top_k(best_scores, limit)]
+
+    @timed
+    def search(self, query: str, backend: str = "fuzz", limit: int | None = None) -> list[Book]:
+        """
+        Returns a list of books matching the query using the selected search backend.
+        """
+
+        match backend:
+            case "list":
+                return self.search_list(query)
+            case "dict":
+                return self.search_dict(query)
+            case "trigram":
+                return self.search_trigram(query)
+            case "fuzz":
+                return self.search_fuzz(query, limit)
+            case _:
+                raise ValueError(f"Unknown search backend: {backend}")
+
+    @timed
+    def query(self, query: str) -> list[Book]:
+        """
+        Returns a list of books matching every term of a field query, such as
+        author:tolkien year:>1950 publisher:"allen", in insertion order. SQLite picks the most
+        selective index itself.
+        """
+
+        clauses:    list[str] = []
+        parameters: list      = []
+
+        for term in parse(query):
+            if term.numeric:
+                # Only plain numbers are comparable; CAST would turn anything else into a number too
+                clauses.append(f"{term.field} <> '' AND {term.field} NOT GLOB '*[^0-9]*'")
+
+                if term.low is not None:
+                    clauses.append(f"CAST({term.field} AS INTEGER) >= ?")
+                    parameters.append(term.low)
+
+                if term.high is not None:
+                    clauses.append(f"CAST({term.field} AS INTEGER) <= ?")
+                    parameters.append(term.high)
+
+                continue
+
+            names:      tuple[str, ...] = DEFAULT_FIELDS if term.field is None else (term.field,)
+            conditions: list[str]       = []
+
+            # NOTE: 10/18/26 - the term's text is folded, so the values are folded by the same
+            #       functions as in Term.matches before comparing, or accented text never matches
+            for name in names:
+                if term.field is None or name == "isbn":
+                    conditions.extend(f"instr(normalize_key({name}), ?)"
+                                      for _ in term.forms)
+                    parameters.extend(term.forms)
+                else:
+                    conditions.append(f"instr(fold({name}), ?)")
+                    parameters.append(term.text)
+
+            clauses.append('(' + " OR ".join(conditions) + ')')
+
+            if term.field is not None:
+                clauses.append(f"{term.field} <> ?")
+                parameters.append(MISSING)
+
+        return self.select(" AND ".join(clauses) or "1", tuple(parameters))
+
+    @timed
+    def update_file(self, file_path: Path) -> str:
+        """
+        Commits any pending changes. Every edit is already written to the database incrementally.
+        """
+
+        self.connection.commit()
+
+        return f"Database {self.file_path} up-to-date. JSON file {file_path} left untouched."
+
+    @timed
+    def add_books(self, records: Iterable[Book | dict],
+                  progress: Callable[[int], None] | None = None) -> ImportReport:
+        """
+        Adds many books in a single transaction. ISBNs are checked against the database one batch
+        at a time, and books whose ISBN is already taken are skipped and reported.
+        """
+
+        report: ImportReport    = ImportReport()
+        seen:   dict[str, Book] = {}
+
+        with self.connection:
+            # NOTE: 10/18/26 - sqlite3 only opens a transaction implicitly before DML, so without an
+            #       explicit BEGIN the DROP TRIGGER below would be committed on its own and stay
+            #       dropped if the import then failed and rolled back
+            if not self.connection.in_transaction:
+                self.connection.execute("BEGIN")
+
+            last_id: int = self.connection.execute("SELECT IFNULL(MAX(id), 0) "
+                                                   "FROM books").fetchone()[0]
+
+            # The full-text index is filled in one sweep at the end instead of by a trigger per row
+            if self.has_fts:
+                self.connection.execute("DROP TRIGGER books_insert")
+
+            for batch in batched(records, BATCH_SIZE):
+                books: list[Book] = [record if isinstance(record, Book) else Book(**record)
+                                     for record in batch]
+
+                # SQLite limits the parameters per statement, so ISBNs are checked per batch
+                rows = self.connection.execute(f"SELECT {COLUMNS} FROM books WHERE isbn IN "
+                                               f"({', '.join('?' * len(books))})",
+                                               tuple(book.isbn for book in books))
+
+                existing: dict[str, Book] = {row[2]: Book(*row) for row in rows}
+                accepted: list[Book]      = []
+
+                for book in books:
+                    other: Book | None = seen.get(book.isbn) or existing.get(book.isbn)
+
+                    if other is None:
+                        seen[book.isbn] = book
+                        accepted.append(book)
+                    elif other == book:
+                        report.duplicates.append(book.isbn)
+                    else:
+                        report.conflicts.append(book.isbn)
+
+                self.connection.executemany(INSERT, (tuple(getattr(book, name) for name in FIELDS)
+                                                     for book in accepted))
+
+                report.read  += len(books)
+                report.added += len(accepted)
+
+                if progress is not None:
+                    progress(report.read)
+
+            if self.has_fts:
+                self.connection.execute("INSERT INTO books_fts (rowid, title, author, isbn) "
+                                        "SELECT id, title, author, isbn FROM books WHERE id > ?",
+                                        (last_id,))
+                self.connection.execute(FTS_INSERT_TRIGGER)
+
+        return report
+
+    @timed
+    def load_file(self, file_path: Path, progress: Callable[[int], None] | None = None) -> str:
+        """
+        Imports an existing JSON or JSON Lines file into the database one record at a time, skipping
+        ISBNs which already exist.
+        """
+
+        report: ImportReport = self.add_books(iter_records(file_path), progress)
+
+        return (f"JSON data from file {file_path} imported into database {self.file_path}. "
+                f"{report.summary()}")
+
+    @timed
+    def import_file(self, file_path: Path,
+                    progress: Callable[[int], None] | None = None) -> ImportReport:
+        """
+        Bulk imports a CSV, JSON, or JSON Lines file, detected from its suffix.
+        """
+
+        if file_path.suffix == ".csv":
+            return self.add_books(iter_csv(file_path), progress)
+
+        return self.add_books(iter_records(file_path), progress)
+
+    def close(self) -> None:
+        """
+        Commits any pending changes and closes the connection.
+        """
+
+        self.connection.commit()
+        self.connection.close()
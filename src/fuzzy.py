@@ -0,0 +1,158 @@
+# module fuzzy
+"""
+Contains the implementation of the FuzzyIndex class and its subsequence scorer.
+"""
+
+import heapq
+from itertools import islice
+from typing import Iterator
+
+from normalize import normalize_key, query_forms
+
+MATCH_SCORE:       int = 16
+CONSECUTIVE_BONUS: int = 12
+BOUNDARY_BONUS:    int = 8
+MAX_GAP_PENALTY:   int = 8
+
+def char_mask(text: str) -> int:
+    """
+    Returns a 64-bit mask with one bit set for each (hashed) character in the text.
+    """
+
+    mask: int = 0
+
+    for char in set(text):
+        mask |= 1 << (ord(char) & 63)
+
+    return mask
+
+def score(query: str, text: str) -> int | None:
+    """
+    Returns the score of the query as a subsequence of the text, or None if it isn't one. Both
+    strings are expected to be normalized.
+    """
+
+    # NOTE: 10/18/26 - each query character is matched at its leftmost position after the previous
+    #       match, so the text is scanned at most once and there is no backtracking
+
+    total:    int = 0
+    position: int = 0
+    previous: int = -2
+
+    for char in query:
+        index: int = text.find(char, position)
+
+        if index == -1:
+            return None
+
+        if index == previous + 1:
+            total += CONSECUTIVE_BONUS
+        elif index == 0 or not text[index - 1].isalnum():
+            total += BOUNDARY_BONUS
+
+        total   += MATCH_SCORE - min(index - position, MAX_GAP_PENALTY)
+        previous = index
+        position = index + 1
+
+    # Prefer matches which start early in shorter strings
+    first: int = text.find(query[0]) if query else 0
+
+    return total - min(first, MAX_GAP_PENALTY) - len(text) // 16
+
+class FuzzyIndex:
+    """
+    A collection of keys with their normalized forms and character masks, used for fuzzy finding
+    and substring matching.
+    """
+
+    def __init__(self) -> None:
+        self.keys: dict[str, tuple[str, int]] = {}
+        self.refs: dict[str, int]             = {}
+
+    def add(self, *keys: str) -> None:
+        """
+        Adds each key to the index, or increments its reference count if it already exists.
+        """
+
+        for key in keys:
+            count: int = self.refs.get(key, 0)
+
+            if count == 0:
+                normalized: str = normalize_key(key)
+                self.keys[key] = (normalized, char_mask(normalized))
+
+            self.refs[key] = count + 1
+
+    def remove(self, *keys: str) -> None:
+        """
+        Decrements the reference count of each key and removes it once it's no longer used.
+        """
+
+        for key in keys:
+            count: int = self.refs[key] - 1
+
+            if count == 0:
+                del self.refs[key]
+                del self.keys[key]
+            else:
+                self.refs[key] = count
+
+    def search(self, query: str) -> list[tuple[int, str]]:
+        """
+        Returns a list of (score, key) pairs for every key the query is a fuzzy match for.
+        """
+
+        # The digits of an ISBN-like query are a subsequence of every key its other form matches
+        normalized: str = query_forms(query)[-1]
+        query_mask: int = char_mask(normalized)
+
+        results: list[tuple[int, str]] = []
+
+        # NOTE: 10/18/26 - every key is still visited in Python, about 25 ms for the 200,000 keys
+        #       of 100,000 books before any scoring; trigram postings can't prune a subsequence
+        #       match, and postings of the query's rarest character saved too little to keep
+        for key, (text, mask) in self.keys.items():
+            # A key can only contain the query as a subsequence if it contains all of its characters
+            if query_mask & mask != query_mask:
+                continue
+
+            key_score: int | None = score(normalized, text)
+
+            if key_score is not None:
+                results.append((key_score, key))
+
+        return results
+
+    def search_chunks(self, query: str, chunk_size: int) -> Iterator[list[tuple[int, str]]]:
+        """
+        Yields the (score, key) pairs for the query one chunk of keys at a time, so the caller can
+        stop scanning at any point.
+        """
+
+        normalized: str                                   = query_forms(query)[-1]
+        query_mask: int                                   = char_mask(normalized)
+        items:      Iterator[tuple[str, tuple[str, int]]] = iter(self.keys.items())
+
+        while chunk := list(islice(items, chunk_size)):
+            results: list[tuple[int, str]] = []
+
+            for key, (text, mask) in chunk:
+                if query_mask & mask != query_mask:
+                    continue
+
+                key_score: int | None = score(normalized, text)
+
+                if key_score is not None:
+                    results.append((key_score, key))
+
+            yield results
+
+def top_k(scores: dict[int, int], limit: int | None = None) -> list[int]:
+    """
+    Returns the IDs with the highest scores in descending order, keeping ties in ascending ID order.
+    """
+
+    if limit is None:
+        return sorted(scores, key=lambda i: (-scores[i], i))
+
+    return heapq.nsmallest(limit, scores, key=lambda i: (-scores[i], i))
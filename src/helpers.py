@@ -3,25 +3,39 @@
 Contains various helper functions for printing to the console.
 """
 
-import os
-import math
+from typing import Sequence
+from collections import OrderedDict
 
 from rich import box
 from rich.align import Align
 from rich.panel import Panel
+from rich.console import Console
 from rich.table import Table
 from rich.prompt import Prompt
 from rich import print as rprint
+from rich import get_console
 
 from book import Book
 from colors import colors
+from instrument import span
+from results import LazyResults
+
+PAGE_SIZE: int = 10
+
+# Rendered pages kept per interactive table, enough to page back and forth without redrawing
+RENDER_CACHE_SIZE: int = 64
+
+# A page as drawn: its number, table type, page total, and console width
+PageKey = tuple[int, str, str, int]
 
 def clear_screen() -> None:
     """
-    Clears the console screen using OS-specific commands.
+    Clears the console screen with escape codes rather than a clear subprocess.
     """
 
-    os.system("cls" if os.name == "nt" else "clear")
+    # NOTE: 10/18/26 - rich writes the escape codes only to terminals, and goes through the console
+    #       API on legacy Windows consoles
+    get_console().clear()
 
 def print_mode(message: str) -> None:
     """
@@ -87,37 +101,93 @@ def initialize_large_table() -> Table:
 
     return table
 
-def create_interactive_table(books: list[Book], table_type: str = "small") -> None:
+def render_page(console: Console, books: LazyResults, page: int, table_type: str,
+                page_total: str) -> str:
+    """
+    Returns a page of the table as it would be printed to the console, escape codes included.
+    """
+
+    rows: list[Book] = books[PAGE_SIZE * page:PAGE_SIZE * (page + 1)]
+
+    match table_type:
+        case "small":
+            table: Table = initialize_small_table()
+            for book in rows:
+                table.add_row(book.title, book.author, book.isbn)
+        case "large":
+            table: Table = initialize_large_table()
+            for book in rows:
+                table.add_row(book.title, book.author, book.isbn, book.category, book.cover,
+                              book.edition, book.editor, book.pages, book.publisher,
+                              book.translator, book.volume, book.year)
+
+    with console.capture() as capture:
+        console.print(Align(Panel(table, title=f"Page {page + 1} of {page_total}"), align="center"))
+
+    return capture.get()
+
+def cached_page(cache: OrderedDict[PageKey, str], books: LazyResults, page: int,
+                table_type: str) -> str:
     """
-    Creates and displays an interactive table.
+    Returns a rendered page of the table, rendering it only if it isn't in the cache already.
     """
 
-    page:      int = 0
-    page_size: int = 10
-    max_page:  int = math.ceil(len(books) / page_size)
+    # Looking one book past the page, as the table does, settles whether this is the last page
+    # before the total is read, so a prefetched page matches the one shown later
+    books.has_more(PAGE_SIZE * (page + 1))
+
+    console:  Console    = get_console()
+    max_page: int | None = books.page_count(PAGE_SIZE)
+
+    # The total is unknown until the source has been exhausted
+    page_total: str     = '?' if max_page is None else str(max_page)
+    key:        PageKey = (page, table_type, page_total, console.width)
+
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+
+    cache[key] = render_page(console, books, page, table_type, page_total)
+
+    if len(cache) > RENDER_CACHE_SIZE:
+        cache.popitem(last=False)
+
+    return cache[key]
+
+def create_interactive_table(books: Sequence[Book] | LazyResults,
+                             table_type: str = "small") -> None:
+    """
+    Creates and displays an interactive table. Only the books on the visible page and its
+    neighbours are requested from the source.
+    """
+
+    if not isinstance(books, LazyResults):
+        books = LazyResults(books, len(books))
+
+    page:  int                       = 0
+    pages: OrderedDict[PageKey, str] = OrderedDict()
 
     while True:
-        start: int = page_size * page
-        end:   int = start + page_size
-
-        end = min(end, len(books))
-
-        match table_type:
-            case "small":
-                table: Table = initialize_small_table()
-                for i in range(start, end):
-                    table.add_row(books[i].title, books[i].author, books[i].isbn)
-            case "large":
-                table: Table = initialize_large_table()
-                for i in range(start, end):
-                    table.add_row(books[i].title, books[i].author, books[i].isbn, books[i].category,
-                                  books[i].cover, books[i].edition, books[i].editor, books[i].pages,
-                                  books[i].publisher, books[i].translator, books[i].volume,
-                                  books[i].year)
-
-        rprint(Align(Panel(table, title=f"Page {page + 1} of {max_page}"), align="center"))
-
-        if max_page > 1:
+        end: int = PAGE_SIZE * (page + 1)
+
+        # Only fetching and drawing the page is timed, not the wait for the next key
+        with span("create_interactive_table.render"):
+            has_next: bool = books.has_more(end)
+            rendered: str  = cached_page(pages, books, page, table_type)
+
+            get_console().file.write(rendered)
+            get_console().file.flush()
+
+        # NOTE: 10/18/26 - the neighbouring pages are rendered while the user reads this one, so
+        #       paging either way is a cache hit
+        with span("create_interactive_table.prefetch"):
+            if has_next:
+                cached_page(pages, books, page + 1, table_type)
+
+            if page > 0:
+                cached_page(pages, books, page - 1, table_type)
+
+        if page > 0 or has_next:
             prompt: str = Prompt.ask(r"\[n]ext, \[p]rev, \[g]oto, \[t]oggle details, \[q]uit",
                                      choices=['n', 'p', 'g', 't', 'q'])
         else:
@@ -125,7 +195,7 @@ def create_interactive_table(books: list[Book], table_type: str = "small") -> No
 
         match prompt:
             case 'n':
-                if end != len(books):
+                if has_next:
                     page += 1
             case 'p':
                 if page != 0:
@@ -134,10 +204,10 @@ def create_interactive_table(books: list[Book], table_type: str = "small") -> No
                 while True:
                     page_no: str = Prompt.ask("Page")
 
-                    if page_no.isdigit():
-                        page = int(page_no) - 1
-
-                        if 0 <= page < max_page:
+                    if page_no.isdigit() and int(page_no) > 0:
+                        # Only fetches up to the requested page to check that it exists
+                        if books.has_more(PAGE_SIZE * (int(page_no) - 1)):
+                            page = int(page_no) - 1
                             break
 
                     print_error("Enter a valid page number.")
@@ -0,0 +1,218 @@
+# module indexes
+"""
+Contains the implementation of the SortedIndex class used for ordered listings, prefix queries, and
+range queries.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate
+from typing import Iterable, Iterator
+
+from book import MISSING
+from normalize import fold
+
+# Fields whose values are indexed as integers for range queries
+NUMERIC_FIELDS: tuple[str, ...] = ("pages", "year")
+
+# Fields with an ordered index; each costs one entry per book, so only the useful ones are kept
+ORDERED_FIELDS: tuple[str, ...] = ("title", "author", "publisher", "pages", "year")
+
+# Sorts after any character, so every key starting with a prefix sorts before the prefix plus this
+MAX_CHAR: str = chr(0x10FFFF)
+
+# Entries per chunk of a sorted index; a chunk is split in two once it holds twice as many
+CHUNK_SIZE: int = 1000
+
+# Up to this many pending entries are inserted one by one rather than by sorting the whole index
+INSORT_LIMIT: int = 64
+
+def number(value: str) -> int | None:
+    """
+    Returns the value as an integer, or None if it isn't a plain number.
+    """
+
+    return int(value) if value.isdecimal() else None
+
+def sort_key(name: str, value: str) -> int | str | None:
+    """
+    Returns the key a field value is ordered by: numeric fields by number and the rest ignoring
+    case and accents. Returns None for values which aren't ordered, such as missing ones.
+    """
+
+    if name in NUMERIC_FIELDS:
+        return number(value)
+
+    return None if value == MISSING else fold(value)
+
+class SortedIndex:
+    """
+    A sorted list of (key, ID) pairs split into chunks, so that ranges of keys can be found by
+    binary search while inserting or removing an entry only shifts the entries of one chunk rather
+    than of the whole index. Keys are either all integers or all strings, and ties are in ID order.
+    """
+
+    def __init__(self) -> None:
+        self.chunks:  list[list[tuple[int | str, int]]] = []
+        self.maxes:   list[tuple[int | str, int]]       = []
+        self.starts:  list[int] | None                  = None
+        self.size:    int                               = 0
+        self.pending: list[tuple[int | str, int]]       = []
+
+    def add(self, key: int | str, book_id: int) -> None:
+        """
+        Adds an entry. Entries are sorted into place the next time the index is read, so adding
+        many at once costs one sort instead of one insertion each.
+        """
+
+        self.pending.append((key, book_id))
+
+    def add_many(self, entries: Iterable[tuple[int | str, int]]) -> None:
+        """
+        Adds many entries at once.
+        """
+
+        self.pending.extend(entries)
+
+    def insert(self, entry: tuple[int | str, int]) -> None:
+        """
+        Inserts an entry into the chunk it sorts into, splitting the chunk if it grows too large.
+        """
+
+        if not self.chunks:
+            self.chunks.append([entry])
+            self.maxes.append(entry)
+        else:
+            chunk: int = min(bisect_left(self.maxes, entry), len(self.chunks) - 1)
+
+            insort(self.chunks[chunk], entry)
+            self.maxes[chunk] = self.chunks[chunk][-1]
+
+            if len(self.chunks[chunk]) > 2 * CHUNK_SIZE:
+                half: list[tuple[int | str, int]] = self.chunks[chunk][CHUNK_SIZE:]
+
+                del self.chunks[chunk][CHUNK_SIZE:]
+
+                self.chunks.insert(chunk + 1, half)
+                self.maxes.insert(chunk, self.chunks[chunk][-1])
+
+        self.size   += 1
+        self.starts  = None
+
+    def remove(self, key: int | str, book_id: int) -> None:
+        """
+        Removes an entry.
+        """
+
+        self.flush()
+
+        entry: tuple[int | str, int] = (key, book_id)
+        chunk: int                   = bisect_left(self.maxes, entry)
+
+        del self.chunks[chunk][bisect_left(self.chunks[chunk], entry)]
+
+        if self.chunks[chunk]:
+            self.maxes[chunk] = self.chunks[chunk][-1]
+        else:
+            del self.chunks[chunk]
+            del self.maxes[chunk]
+
+        self.size   -= 1
+        self.starts  = None
+
+    def flush(self) -> None:
+        """
+        Sorts any pending entries into place.
+        """
+
+        if not self.pending:
+            return
+
+        if len(self.pending) < INSORT_LIMIT:
+            for entry in self.pending:
+                self.insert(entry)
+        else:
+            # NOTE: 10/18/26 - the entries are already sorted, so Timsort merges in the new run in
+            #       roughly linear time
+            entries: list[tuple[int | str, int]] = [entry for chunk in self.chunks
+                                                    for entry in chunk]
+            entries.extend(self.pending)
+            entries.sort()
+
+            self.chunks = [entries[i:i + CHUNK_SIZE] for i in range(0, len(entries), CHUNK_SIZE)]
+            self.maxes  = [chunk[-1] for chunk in self.chunks]
+            self.size   = len(entries)
+            self.starts = None
+
+        self.pending.clear()
+
+    def __len__(self) -> int:
+        return self.size + len(self.pending)
+
+    def chunk_starts(self) -> list[int]:
+        """
+        Returns the position of the first entry of each chunk, recounting them after any change.
+        """
+
+        if self.starts is None:
+            self.starts = list(accumulate((len(chunk) for chunk in self.chunks[:-1]), initial=0))
+
+        return self.starts
+
+    def position(self, entry: tuple, right: bool = False) -> int:
+        """
+        Returns the position the entry would be inserted at, before any equal entries or after
+        them if right is set, as bisect does on a flat list.
+        """
+
+        search = bisect_right if right else bisect_left
+        chunk: int = search(self.maxes, entry)
+
+        if chunk == len(self.chunks):
+            return self.size
+
+        return self.chunk_starts()[chunk] + search(self.chunks[chunk], entry)
+
+    def bounds(self, low: int | str | None, high: int | str | None) -> tuple[int, int]:
+        """
+        Returns the positions of the first entry with a key of at least low and of the entry after
+        the last with a key of at most high. Either limit may be None for an open range.
+        """
+
+        self.flush()
+
+        start: int = 0 if low is None else self.position((low,))
+        stop:  int = self.size if high is None else self.position((high, float("inf")), True)
+
+        return start, max(start, stop)
+
+    def prefix_bounds(self, prefix: str) -> tuple[int, int]:
+        """
+        Returns the positions of the first entry with a key starting with the prefix and of the
+        entry after the last.
+        """
+
+        self.flush()
+
+        return self.position((prefix,)), self.position((prefix + MAX_CHAR,))
+
+    def ids(self, start: int, stop: int, reverse: bool = False) -> Iterator[int]:
+        """
+        Yields the IDs of the entries between the given positions in key order, or in reverse.
+        """
+
+        if start >= stop:
+            return
+
+        starts: list[int] = self.chunk_starts()
+        first:  int       = bisect_right(starts, start) - 1
+        last:   int       = bisect_right(starts, stop - 1) - 1
+
+        chunks: range = range(last, first - 1, -1) if reverse else range(first, last + 1)
+
+        for chunk in chunks:
+            offset:  int                         = starts[chunk]
+            entries: list[tuple[int | str, int]] = self.chunks[chunk][max(start - offset, 0):
+                                                                      stop - offset]
+
+            for entry in reversed(entries) if reverse else entries:
+                yield entry[1]
@@ -0,0 +1,288 @@
+# module instrument
+"""
+Contains opt-in instrumentation of library operations: call counts, latency histograms, and
+allocation statistics, along with cProfile and tracemalloc reports covering a whole session.
+"""
+
+import os
+import json
+import time
+from pathlib import Path
+from threading import Lock, get_ident
+from functools import wraps
+from contextlib import nullcontext
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, ContextManager
+
+# Set to any value to record operations, or to "memory" to also record their allocations, which
+# slows every operation down considerably
+STATS_MODE: str = os.environ.get("LIBTERM_STATS", "")
+
+# The recorded operations are dumped to this JSON file on quit, which also enables recording
+STATS_FILE: str = os.environ.get("LIBTERM_STATS_FILE", "")
+
+# The session is profiled and its cProfile stats written here on quit, along with a text report of
+# the slowest functions and the largest allocations
+PROFILE_FILE: str = os.environ.get("LIBTERM_PROFILE", "")
+
+ENABLED:      bool = bool(STATS_MODE or STATS_FILE)
+TRACE_MEMORY: bool = STATS_MODE == "memory"
+
+# Upper bounds of the latency buckets in seconds; slower calls fall into one final bucket
+BUCKETS: tuple[float, ...] = (1e-4, 1e-3, 1e-2, 1e-1, 1.0)
+
+# Lines of the profile and allocation reports
+REPORT_LINES: int = 25
+
+# NOTE: 10/18/26 - the profiling modules take several milliseconds to import, so they're only
+#       loaded when the session asks for them
+if TRACE_MEMORY or PROFILE_FILE:
+    import tracemalloc
+
+@dataclass
+class Operation:
+    """
+    The statistics recorded for one kind of operation. Allocations are net bytes still allocated
+    when the operation returns, and the peak is the most memory it held at once; both only cover
+    the traced calls, those which no other thread's operation overlapped.
+    """
+
+    count:     int       = 0
+    total:     float     = 0.0
+    maximum:   float     = 0.0
+    buckets:   list[int] = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+    traced:    int       = 0
+    allocated: int       = 0
+    peak:      int       = 0
+
+    def record(self, elapsed: float, allocated: int | None = None, peak: int = 0) -> None:
+        """
+        Adds one call to the statistics, along with its memory if it was traced.
+        """
+
+        self.count   += 1
+        self.total   += elapsed
+        self.maximum  = max(self.maximum, elapsed)
+
+        if allocated is not None:
+            self.traced    += 1
+            self.allocated += allocated
+            self.peak       = max(self.peak, peak)
+
+        bucket: int = 0
+
+        while bucket < len(BUCKETS) and elapsed > BUCKETS[bucket]:
+            bucket += 1
+
+        self.buckets[bucket] += 1
+
+    def to_dict(self) -> dict:
+        """
+        Returns the statistics as a dictionary suitable for JSON.
+        """
+
+        labels: list[str] = [f"<={bound}" for bound in BUCKETS] + [f">{BUCKETS[-1]}"]
+
+        return {
+            "count":     self.count,
+            "total":     self.total,
+            "mean":      self.total / self.count if self.count else 0.0,
+            "max":       self.maximum,
+            "histogram": dict(zip(labels, self.buckets)),
+            "traced":    self.traced,
+            "allocated": self.allocated,
+            "peak":      self.peak
+        }
+
+operations: defaultdict[str, Operation] = defaultdict(Operation)
+profiler:   "cProfile.Profile | None"   = None
+
+# Number of spans currently open on each thread, and of times a span opened while another thread had
+# one open. tracemalloc keeps a single peak and total for the whole process, so only a span opening
+# when none are open can reset the peak, and a span's memory is only recorded if no other thread's
+# span overlapped it
+# NOTE: 10/18/26 - spans never contain an await, so those of asyncio tasks can't interleave and
+#       counting by thread is enough; allocations made outside any span still count
+spans_lock: Lock           = Lock()
+open_spans: dict[int, int] = {}
+overlaps:   int            = 0
+
+class Span:
+    """
+    Records the time (and optionally memory) spent inside a with block as one call of an operation.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name:      str   = name
+        self.thread:    int   = 0
+        self.outermost: bool  = False
+        self.alone:     bool  = False
+        self.overlaps:  int   = 0
+        self.memory:    int   = 0
+        self.start:     float = 0.0
+
+    def __enter__(self) -> "Span":
+        global overlaps
+
+        self.thread = get_ident()
+
+        with spans_lock:
+            self.outermost = not open_spans
+            self.alone     = open_spans.keys() <= {self.thread}
+
+            if not self.alone:
+                overlaps += 1
+
+            self.overlaps = overlaps
+            open_spans[self.thread] = open_spans.get(self.thread, 0) + 1
+
+            if TRACE_MEMORY:
+                if self.outermost:
+                    tracemalloc.reset_peak()
+
+                self.memory = tracemalloc.get_traced_memory()[0]
+
+        self.start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *_) -> None:
+        elapsed: float = time.perf_counter() - self.start
+
+        allocated: int | None = None
+        peak:      int        = 0
+
+        with spans_lock:
+            open_spans[self.thread] -= 1
+
+            if not open_spans[self.thread]:
+                del open_spans[self.thread]
+
+            if TRACE_MEMORY and self.alone and overlaps == self.overlaps:
+                current, highest = tracemalloc.get_traced_memory()
+
+                allocated = current - self.memory
+                peak      = highest - self.memory if self.outermost else 0
+
+            operations[self.name].record(elapsed, allocated, peak)
+
+def span(name: str) -> ContextManager:
+    """
+    Returns a context manager recording its block as a call of the named operation, or one doing
+    nothing if instrumentation is disabled.
+    """
+
+    return Span(name) if ENABLED else nullcontext()
+
+def timed(function: Callable) -> Callable:
+    """
+    Records every call of the decorated function under its qualified name. The function is returned
+    unchanged if instrumentation is disabled, so there's no overhead unless it's asked for.
+    """
+
+    if not ENABLED:
+        return function
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with Span(function.__qualname__):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+def start_session() -> None:
+    """
+    Starts tracing allocations and profiling the session, if either was asked for.
+    """
+
+    global profiler
+
+    if TRACE_MEMORY or PROFILE_FILE:
+        tracemalloc.start()
+
+    if PROFILE_FILE:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+def summary() -> list[str]:
+    """
+    Returns one line per recorded operation, slowest in total first.
+    """
+
+    lines: list[str] = []
+
+    for name, operation in sorted(operations.items(), key=lambda item: -item[1].total):
+        mean:      float = operation.total / operation.count
+        histogram: str   = " ".join(map(str, operation.buckets))
+        line:      str   = (f"{name}: {operation.count} calls, {operation.total * 1000:.1f} ms "
+                            f"total, {mean * 1000:.2f} ms mean, {operation.maximum * 1000:.2f} ms "
+                            f"max, buckets [{histogram}]")
+
+        if TRACE_MEMORY:
+            line += (f", {operation.allocated / 1024:.1f} KiB kept, "
+                     f"{operation.peak / 1024:.1f} KiB peak over {operation.traced} traced calls")
+
+        lines.append(line)
+
+    return lines
+
+def write_profile(file_path: Path) -> None:
+    """
+    Stops profiling and writes the cProfile stats, plus a text report of the functions with the
+    most cumulative time and the lines holding the most memory.
+    """
+
+    global profiler
+
+    import pstats
+
+    profiler.disable()
+    profiler.dump_stats(file_path)
+
+    with open(file_path.with_suffix(".txt"), 'w', encoding="utf-8") as file:
+        stats: pstats.Stats = pstats.Stats(profiler, stream=file)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(REPORT_LINES)
+
+        file.write("Largest allocations still held:\n")
+
+        for statistic in tracemalloc.take_snapshot().statistics("lineno")[:REPORT_LINES]:
+            file.write(f"{statistic}\n")
+
+    profiler = None
+
+def finish_session() -> list[str]:
+    """
+    Writes out whatever was recorded during the session and returns messages describing it.
+    """
+
+    messages: list[str] = []
+
+    if ENABLED:
+        bounds: str = ", ".join(map(str, BUCKETS))
+
+        messages.append(f"Operation timings; buckets count calls taking up to {bounds} seconds "
+                        "and longer:")
+        messages.extend(summary())
+
+    if STATS_FILE:
+        with open(STATS_FILE, 'w', encoding="utf-8") as file:
+            json.dump({name: operation.to_dict() for name, operation in operations.items()},
+                      file, indent=4)
+
+        messages.append(f"Operation statistics written to {STATS_FILE}.")
+
+    if profiler is not None:
+        file_path: Path = Path(PROFILE_FILE)
+
+        write_profile(file_path)
+
+        messages.append(f"Profile written to {file_path} and summarized in "
+                        f"{file_path.with_suffix('.txt')}.")
+
+    if (TRACE_MEMORY or PROFILE_FILE) and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+    return messages
@@ -0,0 +1,180 @@
+# module journal
+"""
+Contains the implementation of the Journal class and helpers for writing files atomically.
+"""
+
+import os
+import json
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from locking import Stamp, stamp
+
+def atomic_dump(data: list[dict], file_path: Path) -> None:
+    """
+    Writes JSON data to a temporary file and swaps it in place of the given file once synced.
+    """
+
+    temp_path: Path = file_path.with_name(f".{file_path.name}.tmp")
+
+    with open(temp_path, 'w', encoding="utf-8") as json_file:
+        json.dump(data, json_file, indent=4)
+        json_file.flush()
+        os.fsync(json_file.fileno())
+
+    os.replace(temp_path, file_path)
+
+class Journal:
+    """
+    An append-only log of library changes which is synced to disk after every entry. Several
+    sessions may append to the same journal while holding the library's lock, each reading the
+    others' entries from where it last left off.
+    """
+
+    def __init__(self, file_path: Path) -> None:
+        self.file_path: Path       = file_path
+        self.count:     int        = 0
+        self.offset:    int        = 0
+        self.inode:     int | None = None
+
+    @property
+    def size(self) -> int:
+        """
+        Returns the size of the journal in bytes.
+        """
+
+        try:
+            return self.file_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def append(self, operation: str, **data: dict | str) -> None:
+        """
+        Appends an entry to the journal and waits until it has been written to disk.
+        """
+
+        line: str = json.dumps({"op": operation, **data}, ensure_ascii=False) + '\n'
+
+        with open(self.file_path, 'a', encoding="utf-8") as journal_file:
+            journal_file.write(line)
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+            self.seen(journal_file.fileno())
+
+        self.count += 1
+
+    def append_many(self, operation: str, entries: Iterable[dict]) -> None:
+        """
+        Appends many entries to the journal and waits once until all of them are written to disk.
+        """
+
+        with open(self.file_path, 'a', encoding="utf-8") as journal_file:
+            for data in entries:
+                journal_file.write(json.dumps({"op": operation, **data}, ensure_ascii=False) + '\n')
+                self.count += 1
+
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+            self.seen(journal_file.fileno())
+
+    def seen(self, fd: int) -> None:
+        """
+        Records that everything in the open journal has been read or written by this session.
+        """
+
+        status: os.stat_result = os.fstat(fd)
+
+        self.offset = status.st_size
+        self.inode  = status.st_ino
+
+    def replay(self) -> Iterator[dict]:
+        """
+        Yields every complete entry in the journal, discarding a partially written final entry.
+        """
+
+        if not self.file_path.is_file():
+            return
+
+        valid_bytes: int = 0
+
+        with open(self.file_path, 'rb') as journal_file:
+            for line in journal_file:
+                # NOTE: 10/18/26 - a crash mid-write can only tear the last line, which was never
+                #       acknowledged, so it's safe to drop it along with anything after it
+                if not line.endswith(b'\n'):
+                    break
+
+                try:
+                    entry: dict = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+
+                valid_bytes += len(line)
+                self.count  += 1
+
+                yield entry
+
+        if valid_bytes != self.size:
+            os.truncate(self.file_path, valid_bytes)
+
+        self.offset = valid_bytes
+        self.inode  = os.stat(self.file_path).st_ino
+
+    def changed(self) -> bool:
+        """
+        Returns whether another session has written to or compacted the journal since this session
+        last read or wrote it.
+        """
+
+        current: Stamp | None = stamp(self.file_path)
+
+        if current is None:
+            return self.inode is not None
+
+        return current[0] != self.inode or current[2] != self.offset
+
+    def tail(self) -> Iterator[dict]:
+        """
+        Yields the complete entries other sessions have appended since this session last read or
+        wrote the journal. Starts from the beginning if the journal was compacted in the meantime.
+        """
+
+        current: Stamp | None = stamp(self.file_path)
+
+        if current is None:
+            self.offset = 0
+            self.inode  = None
+            return
+
+        # NOTE: 10/18/26 - compaction deletes the journal, so a new inode (or a shorter file) means
+        #       every entry in it is new
+        if current[0] != self.inode or current[2] < self.offset:
+            self.offset = 0
+            self.inode  = current[0]
+
+        with open(self.file_path, 'rb') as journal_file:
+            journal_file.seek(self.offset)
+
+            for line in journal_file:
+                # An entry still being written by a crashed session is left for replay to discard
+                if not line.endswith(b'\n'):
+                    break
+
+                self.offset += len(line)
+                self.count  += 1
+
+                yield json.loads(line)
+
+    def truncate(self) -> None:
+        """
+        Removes every entry from the journal once they have been folded into the snapshot.
+        """
+
+        if self.file_path.is_file():
+            os.remove(self.file_path)
+
+        self.count  = 0
+        self.offset = 0
+        self.inode  = None
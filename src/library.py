@@ -4,98 +4,406 @@ Contains the implementation of the Library class.
 """
 
 import os
-import re
 import json
 from pathlib import Path
-from re import Pattern, Match
+from itertools import islice
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Iterable, Iterator
 from collections import defaultdict
 
-from book import Book
+from book import Book, FIELDS, MISSING
+from cache import QueryCache
+from fuzzy import FuzzyIndex, char_mask, score, top_k
+from indexes import ORDERED_FIELDS, SortedIndex, sort_key
+from instrument import timed
+from journal import Journal, atomic_dump
+from locking import FileLock, Stamp, stamp
+from normalize import fold, query_forms
+from query import DEFAULT_FIELDS, Term, parse
+from report import ImportReport
+from results import LazyResults
+from stream import iter_csv, iter_records
+from trigram import TrigramIndex
+
+COMPACT_THRESHOLD: int = 1 << 20
+PROGRESS_INTERVAL: int = 10000
+
+# Rescanning a book costs more than scanning an index key, so a cached query is only refined if its
+# results are at most this fraction of the library
+REFINE_FRACTION: float = 0.25
+
+# Set LIBTERM_PARALLEL to search with that many worker processes, or to 0 for one per CPU; unset,
+# every search runs in-process
+PARALLEL: str | None = os.environ.get("LIBTERM_PARALLEL")
+
+# When the next index of a field query would yield this many times more books than are left, the
+# remaining books are checked directly instead
+INTERSECT_RATIO: int = 8
+
+def write_books(books: list[Book], file_path: Path) -> str:
+    """
+    Creates, updates, or removes a JSON file containing information about each of the given books.
+    """
+
+    existing_file: bool = file_path.is_file()
+
+    books_data: list[dict] = [book.to_dict() for book in books]
+
+    existing_data: list[dict] | None = None
+
+    if existing_file:
+        with open(file_path, 'r', encoding="utf-8") as json_file:
+            try:
+                existing_data = json.load(json_file)
+            except json.JSONDecodeError:
+                existing_data = None
+
+    if existing_data == books_data:
+        if books:
+            return f"File {file_path} already up-to-date. No changes made."
+
+        os.remove(file_path)
+        return f"File {file_path} already up-to-date and will be removed due to empty list."
+
+    if books:
+        atomic_dump(books_data, file_path)
+
+        if existing_file:
+            return f"Updated file {file_path} successfully."
+
+        return f"Created file {file_path} successfully."
+
+    if existing_file:
+        os.remove(file_path)
+        return f"Removed file {file_path} as the book list is empty."
+
+    return "No books in list. File not created."
 
 class Library:
     """
     A library.
     """
 
-    def __init__(self) -> None:
-        self.books:             list[Book]                  = []
-        self.index_from_title:  defaultdict[str, list[int]] = defaultdict(list)
-        self.index_from_author: defaultdict[str, list[int]] = defaultdict(list)
-        self.index_from_isbn:   dict[str, int]              = {}
-
+    def __init__(self, file_path: Path | None = None) -> None:
+        # NOTE: 10/18/26 - books are keyed by a stable ID that is never reused, so removing a book
+        #       doesn't shift the position of any other book and the indices never need to be
+        #       rewritten; dicts preserve insertion order, so listing order is unchanged
+        self.books:             dict[int, Book]            = {}
+        self.index_from_title:  defaultdict[str, set[int]] = defaultdict(set)
+        self.index_from_author: defaultdict[str, set[int]] = defaultdict(set)
+        self.index_from_isbn:   dict[str, int]             = {}
+        self.next_id:           int                        = 0
+        self.trigram_index:     TrigramIndex               = TrigramIndex()
+        self.fuzzy_index:       FuzzyIndex                 = FuzzyIndex()
+        self.journal:           Journal | None             = None
+        self.unindexed:         dict[int, Book]            = {}
+        self.unordered:         dict[int, Book]            = {}
+        self.cache:             QueryCache                 = QueryCache()
+
+        # The file shared with other sessions, its stamp and books as of the last read or write, and
+        # the lock taken while reading or changing it
+        self.file_path: Path | None     = file_path
+        self.stamp:     Stamp | None    = None
+        self.base:      dict[str, Book] = {}
+        self.file_lock: FileLock | None = None
+
+        # Secondary indices for field queries; title, author, and ISBN are served by the ones above
+        self.index_from_field: dict[str, defaultdict[str, set[int]]] = {
+            name: defaultdict(set) for name in FIELDS if name not in DEFAULT_FIELDS
+        }
+        self.sorted_indexes: dict[str, SortedIndex] = {name: SortedIndex()
+                                                       for name in ORDERED_FIELDS}
+
+        # Incremented on every change so derived state (worker shards, caches) can detect staleness
+        self.version: int = 0
+
+        # Opt-in, since worker processes only pay off for large libraries; smaller ones are still
+        # searched in-process by the searcher
+        self.parallel: "ParallelSearcher | None" = None
+
+        if PARALLEL is not None:
+            from parallel import ParallelSearcher
+
+            self.parallel = ParallelSearcher(self, int(PARALLEL) if PARALLEL.isdecimal() else None)
+
+    @timed
     def add_book(self, book: Book) -> None:
         """
-        Adds a book to the list and updates all dictionaries.
+        Adds a book to the library and records the change in the journal.
         """
 
         # NOTE: 05/30/24 - only called if the book doesn't exist; enforced in main.py
 
-        self.books.append(book)
+        if self.journal is not None:
+            self.record("add", book=book.to_dict())
+            return
+
+        self.insert_book(book)
+
+    @timed
+    def add_books(self, records: Iterable[Book | dict],
+                  progress: Callable[[int], None] | None = None) -> ImportReport:
+        """
+        Adds many books at once. ISBNs are checked against the library and each other in a single
+        pass, and the indices are built in one sweep once every book is stored; the search indices
+        are deferred until the next search needs them. Books whose ISBN is already taken are skipped
+        and reported.
+        """
 
-        book_index: int = len(self.books) - 1
+        if self.journal is None:
+            return self.store_books(records, progress)
 
-        self.index_from_title[book.title].append(book_index)
-        self.index_from_author[book.author].append(book_index)
-        self.index_from_isbn[book.isbn] = book_index
+        # Catch up with other sessions first so ISBNs are checked against their books too
+        with self.shared():
+            self.sync()
 
+            return self.store_books(records, progress)
+
+    def store_books(self, records: Iterable[Book | dict],
+                    progress: Callable[[int], None] | None) -> ImportReport:
+        """
+        Stores many books at once and records them in the journal, as described in add_books.
+        """
+
+        report:   ImportReport    = ImportReport()
+        accepted: dict[str, Book] = {}
+
+        for record in records:
+            book:     Book        = record if isinstance(record, Book) else Book(**record)
+            existing: Book | None = accepted.get(book.isbn) or self.book_by_isbn(book.isbn)
+
+            if existing is None:
+                accepted[book.isbn] = book
+            elif existing == book:
+                report.duplicates.append(book.isbn)
+            else:
+                report.conflicts.append(book.isbn)
+
+            report.read += 1
+            if progress is not None and report.read % PROGRESS_INTERVAL == 0:
+                progress(report.read)
+
+        if self.journal is not None:
+            self.journal.append_many("add", ({"book": book.to_dict()}
+                                             for book in accepted.values()))
+
+        first_id: int = self.next_id
+        self.next_id += len(accepted)
+        self.version += 1
+
+        stored: dict[int, Book] = dict(zip(range(first_id, self.next_id), accepted.values()))
+
+        self.books.update(stored)
+        self.unordered.update(stored)
+
+        for book_id, book in stored.items():
+            self.index_book(book_id, book, deferred=True)
+
+        report.added = len(stored)
+
+        if progress is not None:
+            progress(report.read)
+
+        return report
+
+    @timed
     def edit_book(self, old_book: Book, new_book: Book) -> None:
         """
-        Removes the old book and adds the new one.
+        Removes the old book and adds the new one as a single journal entry.
         """
 
         # NOTE: 05/30/24 - only called if the book exists and the new ISBN isn't taken; enforced in
         #       main.py
 
-        self.remove_book(old_book)
-        self.add_book(new_book)
+        if self.journal is not None:
+            self.record("edit", isbn=old_book.isbn, book=new_book.to_dict())
+            return
 
+        self.delete_book(old_book)
+        self.insert_book(new_book)
+
+    @timed
     def remove_book(self, book: Book) -> None:
         """
-        Removes a book from the list and updates all dictionaries.
+        Removes a book from the library and records the change in the journal.
         """
 
         # NOTE: 05/30/24 - only called if the book exists; enforced in main.py
 
-        isbn:       str = book.isbn
-        book_index: int = self.index_from_isbn[isbn]
+        if self.journal is not None:
+            self.record("remove", isbn=book.isbn)
+            return
+
+        self.delete_book(book)
+
+    def record(self, operation: str, **data: dict | str) -> None:
+        """
+        Appends a change to the shared journal and applies it. Changes journaled by other sessions
+        are applied first, so every session applies the same changes in the same order.
+        """
+
+        with self.shared():
+            self.sync()
+            self.journal.append(operation, **data)
+            self.apply_entry({"op": operation, **data})
+
+    def apply_entry(self, entry: dict) -> None:
+        """
+        Applies a journal entry. The book it names is replaced whether or not it's still there, so
+        applying an entry twice, or after a conflicting change, leaves the same result.
+        """
+
+        isbn: str = entry["book"]["isbn"] if entry["op"] == "add" else entry["isbn"]
+
+        if isbn in self.index_from_isbn:
+            self.delete_book(self.books[self.index_from_isbn[isbn]])
+
+        if entry["op"] in ("add", "edit"):
+            book: Book = Book(**entry["book"])
+
+            if book.isbn in self.index_from_isbn:
+                self.delete_book(self.books[self.index_from_isbn[book.isbn]])
+
+            self.insert_book(book)
+
+    def insert_book(self, book: Book) -> None:
+        """
+        Stores a book under a new ID and updates all dictionaries.
+        """
+
+        book_id: int = self.next_id
+        self.next_id += 1
+        self.version += 1
+
+        self.books[book_id] = book
+
+        self.index_book(book_id, book)
+
+    def index_book(self, book_id: int, book: Book, deferred: bool = False) -> None:
+        """
+        Adds a stored book to every index. Deferred books are only added to the search indices once
+        a search needs them.
+        """
+
+        self.index_from_title[book.title].add(book_id)
+        self.index_from_author[book.author].add(book_id)
+        self.index_from_isbn[book.isbn] = book_id
+
+        if deferred:
+            self.unindexed[book_id] = book
+        else:
+            self.index_search_keys(book_id, book)
+            self.index_ordered(book_id, book)
+
+    def index_search_keys(self, book_id: int, book: Book) -> None:
+        """
+        Adds a stored book to the search indices.
+        """
+
+        self.fuzzy_index.add(book.title, book.author, book.isbn)
+        self.trigram_index.add(book_id, *self.normalized_keys(book))
+
+        for name, index in self.index_from_field.items():
+            value: str = getattr(book, name)
+
+            # Missing values never match a field query, so they aren't worth the memory
+            if value != MISSING:
+                index[value].add(book_id)
+
+    def index_ordered(self, book_id: int, book: Book) -> None:
+        """
+        Adds a stored book to the ordered indices.
+        """
+
+        for name, sorted_index in self.sorted_indexes.items():
+            key: int | str | None = sort_key(name, getattr(book, name))
+
+            if key is not None:
+                sorted_index.add(key, book_id)
+
+    def build_ordered(self) -> None:
+        """
+        Adds every book whose indexing was deferred by a bulk import to the ordered indices, one
+        field at a time.
+        """
+
+        if not self.unordered:
+            return
+
+        for name, sorted_index in self.sorted_indexes.items():
+            sorted_index.add_many((key, book_id) for book_id, book in self.unordered.items()
+                                  if (key := sort_key(name, getattr(book, name))) is not None)
+
+        self.unordered.clear()
+
+    def build_deferred(self) -> None:
+        """
+        Adds every book whose indexing was deferred by a bulk import to the search indices.
+        """
+
+        for book_id, book in self.unindexed.items():
+            self.index_search_keys(book_id, book)
+
+        self.unindexed.clear()
 
-        del self.books[book_index]
+    def delete_book(self, book: Book) -> None:
+        """
+        Deletes a book by ID and updates all dictionaries.
+        """
 
-        self.index_from_title[book.title].remove(book_index)
+        isbn:    str = book.isbn
+        book_id: int = self.index_from_isbn[isbn]
+
+        self.version += 1
+
+        del self.books[book_id]
+
+        self.index_from_title[book.title].discard(book_id)
         if not self.index_from_title[book.title]:
             del self.index_from_title[book.title]
 
-        self.index_from_author[book.author].remove(book_index)
+        self.index_from_author[book.author].discard(book_id)
         if not self.index_from_author[book.author]:
             del self.index_from_author[book.author]
 
         del self.index_from_isbn[isbn]
 
-        for title in self.index_from_title:
-            self.index_from_title[title] = [i - 1 if i > book_index else i for i in
-                                            self.index_from_title[title]]
+        if book_id in self.unordered:
+            del self.unordered[book_id]
+        else:
+            for name, sorted_index in self.sorted_indexes.items():
+                key: int | str | None = sort_key(name, getattr(book, name))
+
+                if key is not None:
+                    sorted_index.remove(key, book_id)
+
+        if book_id in self.unindexed:
+            del self.unindexed[book_id]
+        else:
+            self.trigram_index.remove(book_id, *self.normalized_keys(book))
+            self.fuzzy_index.remove(book.title, book.author, book.isbn)
 
-        for author in self.index_from_author:
-            self.index_from_author[author] = [i - 1 if i > book_index else i for i in
-                                              self.index_from_author[author]]
+            for name, index in self.index_from_field.items():
+                value: str = getattr(book, name)
 
-        for isbn_key, idx in self.index_from_isbn.items():
-            if idx > book_index:
-                self.index_from_isbn[isbn_key] -= 1
+                if value != MISSING:
+                    index[value].discard(book_id)
+                    if not index[value]:
+                        del index[value]
 
     def books_by_title(self, title: str) -> list[Book]:
         """
         Returns a list of books with the given title.
         """
 
-        return [self.books[i] for i in self.index_from_title[title]]
+        return [self.books[i] for i in sorted(self.index_from_title.get(title, ()))]
 
     def books_by_author(self, author: str) -> list[Book]:
         """
         Returns a list of books with the given author.
         """
 
-        return [self.books[i] for i in self.index_from_author[author]]
+        return [self.books[i] for i in sorted(self.index_from_author.get(author, ()))]
 
     def book_by_isbn(self, isbn: str) -> Book | None:
         """
@@ -107,129 +415,639 @@ class Library:
         except KeyError:
             return None
 
+    def ordered(self, name: str, start: int, stop: int, reverse: bool = False) -> Iterator[Book]:
+        """
+        Yields the books between two positions of the ordered index on a field.
+        """
+
+        for book_id in self.sorted_indexes[name].ids(start, stop, reverse):
+            yield self.books[book_id]
+
+    def ordered_window(self, name: str, start: int, stop: int,
+                       reverse: bool = False) -> Callable[[int, int], list[Book]]:
+        """
+        Returns a window function for the listing of the books between two positions of the
+        ordered index on a field, which finds any page of it by position.
+        """
+
+        def window(first: int, last: int) -> list[Book]:
+            first = min(first, stop - start)
+            last  = min(last, stop - start)
+
+            if reverse:
+                return list(self.ordered(name, stop - last, stop - first, True))
+
+            return list(self.ordered(name, start + first, start + last))
+
+        return window
+
+    def listing(self) -> LazyResults:
+        """
+        Returns every book in the order added.
+        """
+
+        # Skipping to a page in C is far cheaper than pulling every book before it through Python
+        return LazyResults(self.books.values(), len(self.books),
+                           lambda first, last: list(islice(self.books.values(), first, last)))
+
+    def sorted_books(self, name: str, reverse: bool = False) -> LazyResults:
+        """
+        Returns every book ordered by a field, with the books missing it at the end. Books are only
+        taken from the ordered index as they are shown, so no view needs a sort.
+        """
+
+        self.build_ordered()
+
+        start, stop = self.sorted_indexes[name].bounds(None, None)
+
+        count: int = stop - start
+
+        def missing() -> Iterator[Book]:
+            return (book for book in self.books.values()
+                    if sort_key(name, getattr(book, name)) is None)
+
+        def books() -> Iterator[Book]:
+            yield from self.ordered(name, start, stop, reverse)
+
+            # Only reached once every ordered book has been shown
+            yield from missing()
+
+        ordered: Callable[[int, int], list[Book]] = self.ordered_window(name, start, stop, reverse)
+
+        def window(first: int, last: int) -> list[Book]:
+            books: list[Book] = ordered(first, last)
+
+            # Pages past the ordered books can only be found by scanning for those missing the field
+            if last > count:
+                books.extend(islice(missing(), max(first - count, 0), last - count))
+
+            return books
+
+        return LazyResults(books(), len(self.books), window)
+
+    def books_in_range(self, name: str, low: int | str | None, high: int | str | None,
+                       reverse: bool = False) -> LazyResults:
+        """
+        Returns the books with a value for a field between low and high inclusive, in order. Either
+        limit may be None for an open range; text fields compare ignoring case.
+        """
+
+        self.build_ordered()
+
+        if isinstance(low, str):
+            low = fold(low)
+
+        if isinstance(high, str):
+            high = fold(high)
+
+        start, stop = self.sorted_indexes[name].bounds(low, high)
+
+        return LazyResults(self.ordered(name, start, stop, reverse), stop - start,
+                           self.ordered_window(name, start, stop, reverse))
+
+    def books_with_prefix(self, name: str, prefix: str, reverse: bool = False) -> LazyResults:
+        """
+        Returns the books with a value for a field starting with the prefix, ignoring case, in
+        order.
+        """
+
+        self.build_ordered()
+
+        start, stop = self.sorted_indexes[name].prefix_bounds(fold(prefix))
+
+        return LazyResults(self.ordered(name, start, stop, reverse), stop - start,
+                           self.ordered_window(name, start, stop, reverse))
+
+    def normalized_keys(self, book: Book) -> tuple[str, str, str]:
+        """
+        Returns the normalized title, author, and ISBN of an indexed book.
+        """
+
+        keys: dict[str, tuple[str, int]] = self.fuzzy_index.keys
+
+        return keys[book.title][0], keys[book.author][0], keys[book.isbn][0]
+
+    def contains(self, book: Book, forms: tuple[str, ...]) -> bool:
+        """
+        Returns whether any normalized key of a book contains any form of a query.
+        """
+
+        title, author, isbn = self.normalized_keys(book)
+
+        for form in forms:
+            if form in title or form in author or form in isbn:
+                return True
+
+        return False
+
+    @timed
     def search_list(self, query: str) -> list[Book]:
         """
-        Returns a list of books matching the query. Searches the list of books using regex.
+        Returns a list of books matching the query. Searches the list of books, comparing their
+        normalized keys.
         """
 
-        pattern = re.compile(re.escape(query), re.IGNORECASE)
-        results = []
+        self.build_deferred()
+
+        forms:   tuple[str, ...] = query_forms(query)
+        results: list[Book]      = []
 
-        for book in self.books:
-            if (pattern.search(book.title) or pattern.search(book.author) or
-                pattern.search(book.isbn)):
+        for book in self.books.values():
+            if self.contains(book, forms):
                 results.append(book)
 
         return results
 
+    @timed
     def search_dict(self, query: str) -> list[Book]:
         """
-        Returns a list of books matching the query. Searches the dictionaries using regex.
+        Returns a list of books matching the query. Searches the normalized form of each distinct
+        title, author, and ISBN once.
         """
 
-        pattern:         Pattern[str] = re.compile(re.escape(query), re.IGNORECASE)
-        matched_indices: set          = set()
+        self.build_deferred()
 
-        for title, indices in self.index_from_title.items():
-            if pattern.search(title):
-                matched_indices.update(indices)
+        forms:           tuple[str, ...] = query_forms(query)
+        matched_indices: set             = set()
 
-        for author, indices in self.index_from_author.items():
-            if pattern.search(author):
-                matched_indices.update(indices)
+        # A query has at most two forms, and spelling out the check is much faster than any()
+        first, last = forms[0], forms[-1]
 
-        for isbn, index in self.index_from_isbn.items():
-            if pattern.search(isbn):
-                matched_indices.add(index)
+        for key, (text, _) in self.fuzzy_index.keys.items():
+            if first not in text and last not in text:
+                continue
+
+            matched_indices.update(self.index_from_title.get(key, ()))
+            matched_indices.update(self.index_from_author.get(key, ()))
+
+            if key in self.index_from_isbn:
+                matched_indices.add(self.index_from_isbn[key])
 
         return [self.books[i] for i in matched_indices]
 
-    def search_fuzz(self, query: str) -> list[Book]:
+    @timed
+    def search_trigram(self, query: str) -> list[Book]:
+        """
+        Returns a list of books matching the query. Searches the trigram index for candidates and
+        verifies each one against its normalized keys.
+        """
+
+        self.build_deferred()
+
+        forms:      tuple[str, ...] = query_forms(query)
+        candidates: set[int] | None = self.trigram_index.candidates(query)
+
+        # Queries shorter than a trigram can't be filtered, so every book is a candidate
+        if candidates is None:
+            return self.search_dict(query)
+
+        # A book containing a query's only trigram contains the query, so there's nothing to verify
+        if all(len(form) == 3 for form in forms):
+            return [self.books[i] for i in candidates]
+
+        results: list[Book] = []
+
+        for book_id in candidates:
+            book: Book = self.books[book_id]
+
+            if self.contains(book, forms):
+                results.append(book)
+
+        return results
+
+    @timed
+    def search_fuzz(self, query: str, limit: int | None = None) -> list[Book]:
         """
-        Returns a list of books matching the query. Searches the dictionaries using fuzzy finding.
+        Returns a list of books matching the query, ranked by score. Searches the dictionaries using
+        fuzzy finding.
         """
 
-        matched_indices: set = set()
+        return [self.books[i] for i in top_k(self.fuzzy_scores(query), limit)]
 
-        def fuzz(query: str, collection: dict) -> list[str]:
-            # fuzzy finder adapted from: https://blog.amjith.com/fuzzyfinder-in-10-lines-of-python
-            suggestions: list[tuple[int, int, str]] = []
-            pattern:     str                        = ".*?".join(re.escape(query))
-            regex:       Pattern[str]               = re.compile(pattern, re.IGNORECASE)
+    def fuzzy_scores(self, query: str) -> dict[int, int]:
+        """
+        Returns the best score of every book matching the query using fuzzy finding.
+        """
 
-            for item in collection:
-                match: Match[str] | None = regex.search(item)
+        self.build_deferred()
 
-                if match is not None:
-                    suggestions.append((len(match.group()), match.start(), item))
+        best_scores: dict[int, int] = {}
 
-            return [x for _, _, x in sorted(suggestions)]
+        self.merge_key_scores(best_scores, self.fuzzy_index.search(query))
 
-        for title in fuzz(query, self.index_from_title):
-            matched_indices.update(self.index_from_title[title])
+        return best_scores
 
-        for author in fuzz(query, self.index_from_author):
-            matched_indices.update(self.index_from_author[author])
+    def merge_key_scores(self, best_scores: dict[int, int],
+                         matches: Iterable[tuple[int, str]]) -> None:
+        """
+        Records the score of each matched key against every book using it, keeping the best score
+        of each book.
+        """
 
-        for isbn in fuzz(query, self.index_from_isbn):
-            matched_indices.add(self.index_from_isbn[isbn])
+        def record(book_id: int, key_score: int) -> None:
+            if key_score > best_scores.get(book_id, key_score - 1):
+                best_scores[book_id] = key_score
 
-        return [self.books[i] for i in matched_indices]
+        for key_score, key in matches:
+            for book_id in self.index_from_title.get(key, ()):
+                record(book_id, key_score)
+
+            for book_id in self.index_from_author.get(key, ()):
+                record(book_id, key_score)
 
-    def update_file(self, file_path: Path) -> str:
+            if key in self.index_from_isbn:
+                record(self.index_from_isbn[key], key_score)
+
+    def scan(self, query: str, backend: str) -> dict[int, int]:
         """
-        Creates, updates, or removes a JSON file containing information about each book.
+        Returns the score of every book matching the query using the selected search backend.
+        Books matched by a substring backend all score zero.
         """
 
-        existing_file: bool = file_path.is_file()
+        match backend:
+            case "list":
+                books: list[Book] = self.search_list(query)
+            case "dict":
+                books = (self.search_dict(query) if self.parallel is None
+                         else self.parallel.search_dict(query))
+            case "trigram":
+                books = self.search_trigram(query)
+            case "fuzz":
+                return (self.fuzzy_scores(query) if self.parallel is None
+                        else self.parallel.fuzzy_scores(query))
+            case _:
+                raise ValueError(f"Unknown search backend: {backend}")
+
+        return {self.index_from_isbn[book.isbn]: 0 for book in books}
+
+    def rescan(self, query: str, backend: str, candidates: Iterable[int]) -> dict[int, int]:
+        """
+        Returns the score of every candidate book matching the query using the selected search
+        backend.
+        """
 
-        books_data: list[dict] = [vars(book) for book in self.books]
+        results: dict[int, int] = {}
 
-        existing_data: list[dict] | None = None
+        if backend == "fuzz":
+            normalized: str                   = query_forms(query)[-1]
+            query_mask: int                   = char_mask(normalized)
+            key_scores: dict[str, int | None] = {}
 
-        if existing_file:
-            with open(file_path, 'r', encoding="utf-8") as json_file:
-                try:
-                    existing_data = json.load(json_file)
-                except json.JSONDecodeError:
-                    existing_data = None
+            # Candidates share many keys (authors especially), so each key is only scored once
+            def key_score(key: str) -> int | None:
+                if key not in key_scores:
+                    text, mask = self.fuzzy_index.keys[key]
+                    key_scores[key] = (score(normalized, text) if query_mask & mask == query_mask
+                                       else None)
 
-        if existing_data == books_data:
-            if self.books:
-                return f"File {file_path} already up-to-date. No changes made."
+                return key_scores[key]
 
-            os.remove(file_path)
-            return f"File {file_path} already up-to-date and will be removed due to empty list."
+            for book_id in candidates:
+                book: Book = self.books[book_id]
 
-        if self.books:
-            with open(file_path, 'w', encoding="utf-8") as json_file:
-                json.dump(books_data, json_file, indent=4)
+                best: int | None = max((s for key in (book.title, book.author, book.isbn)
+                                        if (s := key_score(key)) is not None), default=None)
 
-            if existing_file:
-                return f"Updated file {file_path} successfully."
+                if best is not None:
+                    results[book_id] = best
 
-            return f"Created file {file_path} successfully."
+            return results
 
-        if existing_file:
-            os.remove(file_path)
-            return f"Removed file {file_path} as the book list is empty."
+        forms: tuple[str, ...] = query_forms(query)
+
+        for book_id in candidates:
+            if self.contains(self.books[book_id], forms):
+                results[book_id] = 0
+
+        return results
+
+    @timed
+    def search(self, query: str, backend: str = "fuzz", limit: int | None = None) -> list[Book]:
+        """
+        Returns a list of books matching the query using the selected search backend. Results are
+        cached until the library changes, and a query extending a cached one only rescans the books
+        which matched it. Fuzzy results are ranked by score, the rest are in the order added.
+        """
+
+        self.cache.sync(self.version)
+
+        results: dict[int, int] | None = self.cache.get(query, backend)
+
+        if results is None:
+            max_size: int                   = int(len(self.books) * REFINE_FRACTION)
+            previous: dict[int, int] | None = self.cache.closest(query, backend, max_size)
+
+            if previous is not None:
+                results = self.rescan(query, backend, previous)
+            else:
+                results = self.scan(query, backend)
+
+            self.cache.put(query, backend, results)
+
+        return [self.books[i] for i in top_k(results, limit)]
+
+    def term_index(self, term: Term) -> tuple[int, Callable[[], set[int]]] | None:
+        """
+        Returns an estimate of how many books the index for a query term yields, along with a
+        function fetching their IDs, or None if the term can't use an index. The IDs may include
+        books which don't match the term.
+        """
+
+        if term.numeric:
+            sorted_index: SortedIndex = self.sorted_indexes[term.field]
+            start, stop = sorted_index.bounds(term.low, term.high)
+
+            return stop - start, lambda: set(sorted_index.ids(start, stop))
+
+        if term.field in self.index_from_field:
+            # Fields like publisher and category have few distinct values, so these are scanned
+            index:    defaultdict[str, set[int]] = self.index_from_field[term.field]
+            postings: list[set[int]]             = [ids for value, ids in index.items()
+                                                    if term.text in fold(value)]
+
+            return sum(map(len, postings)), lambda: set().union(*postings)
+
+        # Title, author, and ISBN terms (or terms without a field) use the trigram index
+        candidates: set[int] | None = self.trigram_index.candidates(term.text)
+
+        if candidates is None:
+            return None
+
+        return len(candidates), lambda: candidates
+
+    def term_matches(self, book: Book, term: Term) -> bool:
+        """
+        Returns whether a book satisfies a field query term. Titles, authors, and ISBNs are checked
+        against the keys normalized when the book was indexed rather than normalized again.
+        """
+
+        if term.field is None:
+            return self.contains(book, term.forms)
+
+        if term.field not in DEFAULT_FIELDS:
+            return term.matches(book)
+
+        value: str = getattr(book, term.field)
+
+        if value == MISSING:
+            return False
+
+        key: str = self.fuzzy_index.keys[value][0]
+
+        # The first form is the folded text and the last is the same or the digits of an ISBN
+        return term.text in key or term.forms[-1] in key
+
+    @timed
+    def query(self, query: str) -> list[Book]:
+        """
+        Returns a list of books matching every term of a field query, such as
+        author:tolkien year:>1950 publisher:"allen", in the order added. Indices are intersected
+        starting with the most selective, and once the remaining books are few enough they are
+        checked against the other terms directly.
+        """
+
+        terms: list[Term] = parse(query)
+
+        self.build_deferred()
+        self.build_ordered()
+
+        steps: list[tuple[int, Callable[[], set[int]]]] = sorted(
+            (step for term in terms if (step := self.term_index(term)) is not None),
+            key=lambda step: step[0]
+        )
+
+        candidates: set[int] | None = None
+
+        for estimate, fetch in steps:
+            if candidates is not None and estimate > len(candidates) * INTERSECT_RATIO:
+                break
+
+            candidates = fetch() if candidates is None else candidates & fetch()
+
+            if not candidates:
+                return []
+
+        book_ids: Iterable[int] = self.books.keys() if candidates is None else sorted(candidates)
+        results:  list[Book]    = []
+
+        for book_id in book_ids:
+            book: Book = self.books[book_id]
+
+            if all(self.term_matches(book, term) for term in terms):
+                results.append(book)
+
+        return results
+
+    def shared(self) -> ContextManager:
+        """
+        Returns the lock on the library file shared with other sessions, or a context doing nothing
+        if the library isn't tied to a file.
+        """
 
-        return "No books in list. File not created."
+        if self.file_path is None:
+            return nullcontext()
 
-    def load_file(self, file_path: Path) -> str:
+        if self.file_lock is None or self.file_lock.target != self.file_path:
+            self.file_lock = FileLock(self.file_path)
+
+        return self.file_lock
+
+    def merge_file(self) -> int:
+        """
+        Applies the changes other sessions have saved to the library file since this session last
+        read or wrote it, and returns how many books changed. A book changed by both sessions keeps
+        this session's version, which is written on the next save. Expects the lock to be held.
+        """
+
+        file_stamp: Stamp | None = stamp(self.file_path)
+
+        if file_stamp == self.stamp:
+            return 0
+
+        disk: dict[str, Book] = {}
+
+        # NOTE: 10/18/26 - a missing file is treated as having nothing to merge rather than as every
+        #       book having been removed, so deleting the file by hand never empties a session
+        if file_stamp is not None:
+            for record in iter_records(self.file_path):
+                book: Book = Book(**record)
+                disk[book.isbn] = book
+        else:
+            self.base = disk
+
+        changed: int = 0
+
+        # NOTE: 10/18/26 - a three-way comparison against the books as last read or written tells
+        #       changes made elsewhere apart from changes made here; only the former are applied,
+        #       so unchanged books keep their indices
+        for isbn in disk.keys() | self.base.keys():
+            theirs: Book | None = disk.get(isbn)
+            base:   Book | None = self.base.get(isbn)
+
+            if theirs == base:
+                continue
+
+            ours: Book | None = self.book_by_isbn(isbn)
+
+            if ours != base:
+                continue
+
+            if ours is not None:
+                self.delete_book(ours)
+
+            if theirs is not None:
+                self.insert_book(theirs)
+
+            changed += 1
+
+        self.stamp = file_stamp
+        self.base  = disk
+
+        return changed
+
+    def sync(self) -> int:
+        """
+        Applies the changes other sessions have saved or journaled since this session last looked,
+        and returns how many there were. Expects the lock to be held.
+        """
+
+        if self.file_path is None:
+            return 0
+
+        changed: int = self.merge_file()
+
+        if self.journal is not None:
+            for entry in self.journal.tail():
+                self.apply_entry(entry)
+                changed += 1
+
+        return changed
+
+    def stale(self) -> bool:
+        """
+        Returns whether another session has saved or journaled changes since this session last read
+        or wrote the library file.
+        """
+
+        if self.file_path is None:
+            return False
+
+        return stamp(self.file_path) != self.stamp or (self.journal is not None and
+                                                       self.journal.changed())
+
+    def refresh(self) -> str | None:
+        """
+        Picks up changes other sessions have made to the library file or journal, returning a
+        message if there were any. Only takes the lock if one of the files has changed.
+        """
+
+        if not self.stale():
+            return None
+
+        with self.shared():
+            changed: int = self.sync()
+
+        if not changed:
+            return None
+
+        return f"Picked up {changed} changes made by other sessions."
+
+    def mark_saved(self, books: Iterable[Book]) -> None:
+        """
+        Records the given books as the contents of the library file just written.
+        """
+
+        self.stamp = stamp(self.file_path)
+        self.base  = {book.isbn: book for book in books}
+
+    @timed
+    def update_file(self, file_path: Path, compact: bool = False) -> str:
         """
-        Loads an existing JSON file and adds the corresponding books into memory.
+        Saves the library. In journal mode, every change is already on disk and the journal is only
+        folded into the JSON file once it grows large or when compaction is requested. Changes other
+        sessions saved in the meantime are kept.
         """
 
+        self.file_path = file_path
+
+        if self.journal is not None and not compact and self.journal.size < COMPACT_THRESHOLD:
+            return f"Changes already saved to journal {self.journal.file_path}."
+
+        # Changes saved by other sessions are merged in first rather than overwritten
+        with self.shared():
+            self.sync()
+
+            message: str = self.write_file(file_path)
+
+            if self.journal is not None:
+                self.journal.truncate()
+
+            self.mark_saved(self.books.values())
+
+        return message
+
+    @timed
+    def write_file(self, file_path: Path) -> str:
+        """
+        Creates, updates, or removes a JSON file containing information about each book.
+        """
+
+        return write_books(list(self.books.values()), file_path)
+
+    @timed
+    def load_file(self, file_path: Path, progress: Callable[[int], None] | None = None) -> str:
+        """
+        Loads an existing JSON or JSON Lines file and adds the corresponding books into memory one
+        record at a time. Calls progress with the running count every so often if given.
+        """
+
+        # The stamp is taken first so that a save racing with the read is picked up afterwards
+        file_stamp: Stamp | None = stamp(file_path)
+
         try:
-            with open(file_path, 'r', encoding="utf-8") as json_file:
-                books_data: list[dict] | list = json.load(json_file)
+            report: ImportReport = self.add_books(iter_records(file_path), progress)
+
+            self.file_path = file_path
+            self.stamp     = file_stamp
+            self.base      = {book.isbn: book for book in self.books.values()}
 
-                for book_data in books_data:
-                    self.add_book(Book(**book_data))
+            if report.duplicates or report.conflicts:
+                return f"JSON data loaded from file {file_path}. {report.summary()}"
 
             return f"JSON data loaded from file {file_path}."
         except FileNotFoundError as e:
             raise e
         except json.JSONDecodeError as e:
             raise e
+
+    @timed
+    def import_file(self, file_path: Path,
+                    progress: Callable[[int], None] | None = None) -> ImportReport:
+        """
+        Bulk imports a CSV, JSON, or JSON Lines file, detected from its suffix.
+        """
+
+        if file_path.suffix == ".csv":
+            return self.add_books(iter_csv(file_path), progress)
+
+        return self.add_books(iter_records(file_path), progress)
+
+    def open_journal(self, file_path: Path) -> str:
+        """
+        Replays any changes left in the journal belonging to the given JSON file and records all
+        further changes in it.
+        """
+
+        journal: Journal = Journal(file_path.with_suffix(".journal"))
+
+        self.file_path = file_path
+
+        # NOTE: 10/18/26 - replaying is idempotent so that entries which were already folded into
+        #       the snapshot before a crash interrupted compaction are harmless
+        with self.shared():
+            for entry in journal.replay():
+                self.apply_entry(entry)
+
+        self.journal = journal
+
+        return f"Journal {journal.file_path} replayed {journal.count} changes."
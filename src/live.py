@@ -0,0 +1,242 @@
+# module live
+"""
+Contains the implementation of the live search mode, which updates the results on each keystroke.
+"""
+
+import os
+import sys
+import math
+import time
+import codecs
+from typing import Iterator
+
+from rich.live import Live
+from rich.text import Text
+from rich.table import Table
+from rich.console import Group
+
+import helpers
+from colors import colors
+from fuzzy import top_k
+from library import REFINE_FRACTION, Library
+from query import is_field_query
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+try:
+    import select
+    import termios
+    import tty
+except ImportError:
+    termios = None
+
+# Keystrokes arriving within this many seconds of each other are handled as one query
+DEBOUNCE_SECONDS: float = 0.03
+
+# The display is redrawn at most once per frame while a search is running
+FRAME_SECONDS: float = 1 / 60
+
+# Keys (or books, when narrowing) scanned between checks for newer keystrokes
+CHUNK_SIZE: int = 1024
+
+def is_supported() -> bool:
+    """
+    Returns whether keys can be read one at a time from the terminal.
+    """
+
+    return sys.stdin.isatty() and (msvcrt is not None or termios is not None)
+
+class KeyReader:
+    """
+    Reads keys from the terminal as they are typed, without waiting for enter.
+    """
+
+    def __init__(self) -> None:
+        self.fd:       int                       = sys.stdin.fileno()
+        self.settings: list | None               = None
+        self.decoder:  codecs.IncrementalDecoder = codecs.getincrementaldecoder("utf-8")("ignore")
+
+    def __enter__(self) -> "KeyReader":
+        if msvcrt is None:
+            self.settings = termios.tcgetattr(self.fd)
+            tty.setcbreak(self.fd)
+
+        return self
+
+    def __exit__(self, *_) -> None:
+        if self.settings is not None:
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self.settings)
+
+    def read(self, timeout: float | None) -> str:
+        """
+        Returns whatever has been typed, waiting at most timeout seconds (or forever if None) for
+        the first key. Returns an empty string if nothing was typed.
+        """
+
+        if msvcrt is not None:
+            deadline: float = math.inf if timeout is None else time.monotonic() + timeout
+
+            while not msvcrt.kbhit():
+                if time.monotonic() >= deadline:
+                    return ""
+
+                time.sleep(0.005)
+
+            keys: str = ""
+
+            while msvcrt.kbhit():
+                keys += msvcrt.getwch()
+
+            return keys
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+
+        if not ready:
+            return ""
+
+        # NOTE: 10/18/26 - reading the descriptor directly instead of sys.stdin, whose buffer would
+        #       hide pending keys from select; the decoder holds on to split multibyte characters
+        return self.decoder.decode(os.read(self.fd, 1024))
+
+class LiveSearch:
+    """
+    A fuzzy search which can be stopped between chunks of work, narrowing the results of an earlier
+    query whenever the new query extends it.
+    """
+
+    def __init__(self, library: Library) -> None:
+        self.library: Library = library
+
+    def run(self, query: str) -> Iterator[dict[int, int]]:
+        """
+        Yields the scores found so far after each chunk of work. Results are only cached once the
+        search runs to completion, so abandoning the iterator cancels the search.
+        """
+
+        library: Library = self.library
+
+        library.cache.sync(library.version)
+
+        # Field queries are only run once complete, since a partial one is usually invalid
+        if not query or is_field_query(query):
+            yield {}
+            return
+
+        cached: dict[int, int] | None = library.cache.get(query, "fuzz")
+
+        if cached is not None:
+            yield cached
+            return
+
+        max_size: int                   = int(len(library.books) * REFINE_FRACTION)
+        previous: dict[int, int] | None = library.cache.closest(query, "fuzz", max_size)
+        scores:   dict[int, int]        = {}
+
+        if previous is not None:
+            candidates: list[int] = list(previous)
+
+            for start in range(0, len(candidates), CHUNK_SIZE):
+                scores.update(library.rescan(query, "fuzz", candidates[start:start + CHUNK_SIZE]))
+                yield scores
+        else:
+            for matches in library.fuzzy_index.search_chunks(query, CHUNK_SIZE):
+                library.merge_key_scores(scores, matches)
+                yield scores
+
+        library.cache.put(query, "fuzz", scores)
+
+def render(library: Library, query: str, scores: dict[int, int], searching: bool) -> Group:
+    """
+    Returns the query line, the best matches which fit on one page, and a status line.
+    """
+
+    prompt: Text = Text("Search: ", style=colors["green"])
+    prompt.append(query)
+    prompt.append("_", style="blink")
+
+    table: Table = helpers.initialize_small_table()
+
+    for book_id in top_k(scores, helpers.PAGE_SIZE):
+        book = library.books[book_id]
+        table.add_row(book.title, book.author, book.isbn)
+
+    status: str = f"{len(scores)} matches"
+
+    if searching:
+        status += " so far, searching..."
+
+    if is_field_query(query):
+        status = "Field query"
+
+    return Group(prompt, table, Text(status + ". Press enter to page through them or escape to "
+                                     "exit.", style=colors["blue"]))
+
+def live_search(library: Library) -> str | None:
+    """
+    Shows the best matches for the query as it is typed. Returns the query once enter is pressed, or
+    None if the search is abandoned with escape.
+    """
+
+    # Indexing deferred by a bulk import would otherwise stall the first keystroke
+    library.build_deferred()
+
+    searcher: LiveSearch                      = LiveSearch(library)
+    query:    str                             = ""
+    search:   Iterator[dict[int, int]] | None = None
+    scores:   dict[int, int]                  = {}
+    drawn:    float                           = 0.0
+
+    with KeyReader() as reader, Live(render(library, query, scores, False), auto_refresh=False,
+                                     transient=True) as live:
+        while True:
+            # While a search is running, only check for keys so the search can carry on
+            keys: str = reader.read(0 if search is not None else None)
+
+            if keys:
+                # Keep reading until typing pauses so a burst of keys starts only one search
+                while more := reader.read(DEBOUNCE_SECONDS):
+                    keys += more
+
+                for key in keys:
+                    match key:
+                        case '\r' | '\n':
+                            return query
+                        case '\x1b':
+                            # A lone escape exits; escape sequences (arrow keys and the like) are
+                            # ignored
+                            if keys == '\x1b':
+                                return None
+
+                            break
+                        case '\x00' | '\xe0' if msvcrt is not None:
+                            # On Windows, special keys are a prefix followed by a key code
+                            break
+                        case '\x7f' | '\b':
+                            query = query[:-1]
+                        case '\x15':
+                            query = ""
+                        case _ if key.isprintable():
+                            query += key
+
+                # Dropping the running search cancels it, since it only advances when iterated
+                search = searcher.run(query)
+                drawn  = 0.0
+
+            if search is None:
+                continue
+
+            try:
+                scores = next(search)
+            except StopIteration:
+                search = None
+
+            # NOTE: 10/18/26 - the first chunk is drawn straight away so results are visible within
+            #       a frame, after which redraws are throttled to the frame rate
+            now: float = time.monotonic()
+
+            if search is None or now - drawn >= FRAME_SECONDS:
+                live.update(render(library, query, scores, search is not None), refresh=True)
+                drawn = now
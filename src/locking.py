@@ -0,0 +1,88 @@
+# module locking
+"""
+Contains the FileLock class and file stamps, which let several sessions share one library file.
+"""
+
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# Identifies one version of a file: its inode, modification time, and size
+Stamp = tuple[int, int, int]
+
+def stamp(file_path: Path) -> Stamp | None:
+    """
+    Returns the stamp of a file, or None if it doesn't exist. Files are replaced rather than
+    rewritten in place, so any save by another session changes at least the inode.
+    """
+
+    try:
+        status: os.stat_result = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+
+    return status.st_ino, status.st_mtime_ns, status.st_size
+
+class FileLock:
+    """
+    An exclusive advisory lock shared by every session using a library file. It's held on a
+    separate lock file, since the library file itself is replaced on every save. The lock is
+    reentrant, and threads within a session take turns holding it.
+    """
+
+    def __init__(self, file_path: Path) -> None:
+        self.target:    Path            = file_path
+        self.file_path: Path            = file_path.with_name(f".{file_path.name}.lock")
+        self.fd:        int | None      = None
+        self.depth:     int             = 0
+        self.guard:     threading.RLock = threading.RLock()
+
+    def __enter__(self) -> "FileLock":
+        self.guard.acquire()
+
+        if self.depth == 0:
+            try:
+                self.fd = os.open(self.file_path, os.O_RDWR | os.O_CREAT)
+
+                if fcntl is not None:
+                    fcntl.flock(self.fd, fcntl.LOCK_EX)
+                elif msvcrt is not None:
+                    # NOTE: 10/18/26 - LK_LOCK gives up with an OSError after about ten seconds,
+                    #       which only happens if another session is stuck holding the lock
+                    msvcrt.locking(self.fd, msvcrt.LK_LOCK, 1)
+            except OSError:
+                if self.fd is not None:
+                    os.close(self.fd)
+                    self.fd = None
+
+                self.guard.release()
+                raise
+
+        self.depth += 1
+
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.depth -= 1
+
+        if self.depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                os.lseek(self.fd, 0, os.SEEK_SET)
+                msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+
+            os.close(self.fd)
+            self.fd = None
+
+        self.guard.release()
@@ -4,88 +4,191 @@ Contains the main loop for running the CLI.
 """
 
 import os
-import json
+import sys
 from pathlib import Path
 
-from rich.prompt import Confirm, Prompt
+DEFAULT_FILE_PATH:   Path = Path("../data/library.json")
+DEFAULT_DB_PATH:     Path = Path("../data/library.db")
+DEFAULT_SOCKET_PATH: Path = Path("../data/library.sock")
 
-import helpers
-import prompts
-from library import Library
+def autosave_interval() -> float | None:
+    """
+    Returns the number of seconds between autosaves set by LIBTERM_AUTOSAVE, or None if autosaving
+    is off.
+    """
+
+    value: str = os.environ.get("LIBTERM_AUTOSAVE", "")
+
+    if not value:
+        return None
+
+    import helpers
+
+    try:
+        seconds: float = float(value)
+    except ValueError:
+        helpers.print_warn(f"Invalid LIBTERM_AUTOSAVE value {value}. Autosave disabled.")
+        return None
+
+    return seconds if seconds > 0 else None
+
+def connect_server() -> "LibraryClient | None":
+    """
+    Returns a client for the library server if one is running, or None otherwise.
+    """
+
+    import socket
+
+    if not hasattr(socket, "AF_UNIX") or not DEFAULT_SOCKET_PATH.exists():
+        return None
+
+    from client import LibraryClient
+
+    try:
+        return LibraryClient(DEFAULT_SOCKET_PATH)
+    except OSError:
+        # A socket left behind by a server which didn't shut down cleanly
+        return None
+
+def open_snapshot() -> "Snapshot | None":
+    """
+    Returns the snapshot of the library file if one was converted after the file was last saved,
+    or None otherwise.
+    """
+
+    snapshot_path: Path = DEFAULT_FILE_PATH.with_suffix(".snap")
+
+    # Changes still in a journal aren't in the file or any snapshot of it
+    if (not snapshot_path.is_file() or DEFAULT_FILE_PATH.with_suffix(".journal").is_file() or
+        snapshot_path.stat().st_mtime_ns < DEFAULT_FILE_PATH.stat().st_mtime_ns):
+        return None
 
-DEFAULT_FILE_PATH: Path = Path("../data/library.json")
+    from snapshot import Snapshot
+
+    try:
+        return Snapshot(snapshot_path)
+    except (OSError, ValueError):
+        return None
 
 def run_cli() -> None:
     """
     Runs the interactive CLI until terminated by the user.
     """
 
-    library: Library = Library()
+    from rich.prompt import Confirm, Prompt
+
+    import helpers
+    import prompts
+    from client import LibraryClient
+    from database import DatabaseLibrary
+    from snapshot import Snapshot
+    from background import BackgroundLibrary, LoadError
+
+    library: BackgroundLibrary | DatabaseLibrary | LibraryClient | None
 
     helpers.clear_screen()
 
-    try:
-        helpers.print_info(library.load_file(DEFAULT_FILE_PATH))
+    # NOTE: 10/18/26 - a running library server already has the books loaded and indexed, so it's
+    #       used in place of loading the file again
+    library = connect_server()
 
-    except FileNotFoundError:
-        helpers.print_warn(f"The {DEFAULT_FILE_PATH} file could not be located.")
+    if library is not None:
+        helpers.print_info(f"Connected to library server on {DEFAULT_SOCKET_PATH}.")
+    elif DEFAULT_DB_PATH.is_file():
+        library = DatabaseLibrary(DEFAULT_DB_PATH)
+        helpers.print_info(f"Database {DEFAULT_DB_PATH} opened.")
+    else:
+        if not DEFAULT_FILE_PATH.is_file():
+            helpers.print_warn(f"The {DEFAULT_FILE_PATH} file could not be located.")
 
-        while True:
-            choice: bool = Confirm.ask(f"Create a new {DEFAULT_FILE_PATH} file?")
+            while True:
+                choice: bool = Confirm.ask(f"Create a new {DEFAULT_FILE_PATH} file?")
 
-            match choice:
-                case True:
-                    break
-                case False:
-                    return
+                match choice:
+                    case True:
+                        break
+                    case False:
+                        return
 
-    except json.JSONDecodeError as e:
-        is_empty: bool = os.stat(DEFAULT_FILE_PATH).st_size == 0
+        # Journal mode is opt-in, but a leftover journal is always replayed so no changes are lost
+        journal: bool = bool(os.environ.get("LIBTERM_JOURNAL") or
+                             DEFAULT_FILE_PATH.with_suffix(".journal").is_file())
 
-        if is_empty:
-            helpers.print_info(f"Empty file {DEFAULT_FILE_PATH}, continuing.")
-        else:
-            helpers.print_error(f"Could not decode JSON from file {DEFAULT_FILE_PATH}: {e}")
-            return
+        # NOTE: 10/18/26 - the file is loaded in the background so the menu shows straight away;
+        #       anything needing the books waits for the load to finish, except for the lookups,
+        #       listings, and searches which an up to date snapshot can answer from the start
+        snapshot: Snapshot | None = open_snapshot() if DEFAULT_FILE_PATH.is_file() else None
+
+        library = BackgroundLibrary(DEFAULT_FILE_PATH, journal, autosave_interval(), snapshot)
 
     while True:
-        user_input: str = Prompt.ask(r"\[a]dd, \[e]dit, \[r]emove, \[l]ist, \[s]earch, \[c]onvert, \[q]uit",
-                                     choices=['a', 'e', 'r', 'l', 's', 'c', 'q'])
-
-        match user_input:
-            case 'a':
-                helpers.clear_screen()
-                prompts.prompt_add(library)
-                helpers.clear_screen()
-            case 'e':
-                helpers.clear_screen()
-                prompts.prompt_edit(library)
-                helpers.clear_screen()
-            case 'r':
-                helpers.clear_screen()
-                prompts.prompt_remove(library)
-                helpers.clear_screen()
-            case 'l':
-                helpers.clear_screen()
-                prompts.prompt_list(library)
-                helpers.clear_screen()
-            case 's':
-                helpers.clear_screen()
-                prompts.prompt_search(library)
-                helpers.clear_screen()
-            case 'c':
-                helpers.clear_screen()
-                prompts.prompt_convert(library)
-            case 'q':
-                helpers.clear_screen()
-                prompts.prompt_quit(library, DEFAULT_FILE_PATH)
-                return
+        try:
+            if isinstance(library, BackgroundLibrary):
+                for notice in library.take_notices():
+                    helpers.print_info(notice)
+
+                # Changes saved by other sessions sharing the file are picked up between commands
+                refreshed: str | None = library.refresh()
+
+                if refreshed is not None:
+                    helpers.print_info(refreshed)
+
+            user_input: str = Prompt.ask(r"\[a]dd, \[e]dit, \[r]emove, \[l]ist, \[s]earch, "
+                                         r"\[c]onvert, \[q]uit",
+                                         choices=['a', 'e', 'r', 'l', 's', 'c', 'q'])
+
+            match user_input:
+                case 'a':
+                    helpers.clear_screen()
+                    prompts.prompt_add(library)
+                    helpers.clear_screen()
+                case 'e':
+                    helpers.clear_screen()
+                    prompts.prompt_edit(library)
+                    helpers.clear_screen()
+                case 'r':
+                    helpers.clear_screen()
+                    prompts.prompt_remove(library)
+                    helpers.clear_screen()
+                case 'l':
+                    helpers.clear_screen()
+                    prompts.prompt_list(library)
+                    helpers.clear_screen()
+                case 's':
+                    helpers.clear_screen()
+                    prompts.prompt_search(library)
+                    helpers.clear_screen()
+                case 'c':
+                    helpers.clear_screen()
+                    prompts.prompt_convert(library)
+                case 'q':
+                    helpers.clear_screen()
+                    prompts.prompt_quit(library, DEFAULT_FILE_PATH)
+
+                    if isinstance(library, (BackgroundLibrary, LibraryClient)):
+                        library.close()
+
+                    return
+        except LoadError as e:
+            helpers.print_error(str(e))
+            return
 
 def main() -> None:
     """
-    Runs the program.
+    Runs the program, or just the command given on the command line, such as lookup <isbn>.
     """
 
+    # NOTE: 10/18/26 - the interactive modules are imported by run_cli rather than at the top, so
+    #       scripted commands don't pay for rich or the in-memory library
+    if len(sys.argv) > 1:
+        import commands
+
+        sys.exit(commands.main(sys.argv[1:], DEFAULT_FILE_PATH))
+
+    import instrument
+
+    instrument.start_session()
+
     run_cli()
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+# module normalize
+"""
+Contains functions for normalizing keys and queries so that they match regardless of case, accents,
+and ISBN separators.
+"""
+
+import unicodedata
+
+ISBN_CHARS: frozenset[str] = frozenset("0123456789xX- ")
+SEPARATORS: str            = "- "
+
+# Strings of ISBN characters with at least this many digits (counting an X check digit) are treated
+# as ISBNs
+ISBN_DIGITS: int = 10
+
+def fold(text: str) -> str:
+    """
+    Returns the text casefolded and with accents stripped, so that "Café" and "cafe" are equal.
+    """
+
+    # Plain ASCII is by far the most common case and has nothing to strip
+    if text.isascii():
+        return text.lower()
+
+    decomposed: str = unicodedata.normalize("NFKD", text)
+
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+def isbn_digits(text: str) -> str:
+    """
+    Returns the text without ISBN separators, casefolded.
+    """
+
+    for separator in SEPARATORS:
+        text = text.replace(separator, "")
+
+    return text.lower()
+
+def normalize_key(key: str) -> str:
+    """
+    Returns the normalized form of a title, author, or ISBN: ISBNs are reduced to their digits and
+    everything else is folded.
+    """
+
+    # Checking the first character rules out nearly every title and author cheaply
+    if (key[:1].isdigit() and set(key) <= ISBN_CHARS and
+        sum(char not in SEPARATORS for char in key) >= ISBN_DIGITS):
+        return isbn_digits(key)
+
+    return fold(key)
+
+def query_forms(query: str) -> tuple[str, ...]:
+    """
+    Returns the normalized forms of a query, any of which may match a normalized key. A query
+    shaped like a partial ISBN, such as 978-0-12, also matches by its digits alone; the digits are
+    always the last form.
+    """
+
+    folded: str = fold(query)
+
+    # NOTE: 10/18/26 - only queries starting with a digit count, so every prefix of such a query
+    #       has the same forms or fewer and the results of a prefix always include the query's
+    if (query and query[0].isdigit() and set(query) <= ISBN_CHARS and
+        any(separator in query for separator in SEPARATORS)):
+        return (folded, isbn_digits(query))
+
+    return (folded,)
@@ -0,0 +1,194 @@
+# module parallel
+"""
+Contains the implementation of the ParallelSearcher class, which libraries use for dictionary and
+fuzzy searches when LIBTERM_PARALLEL is set.
+"""
+
+import os
+import multiprocessing
+from multiprocessing.pool import Pool
+
+from book import Book
+from fuzzy import char_mask, score, top_k
+from library import Library
+from normalize import query_forms
+
+# Below this many distinct keys, or with only one process, a pool costs more than it saves and
+# searches run in-process
+PARALLEL_THRESHOLD: int = 50000
+
+# A shard is a list of (normalized key, character mask, IDs of the books using the key)
+Shard = list[tuple[str, int, tuple[int, ...]]]
+
+# Set in each worker by load_shards; with the fork start method this is inherited memory, so the
+# shards are never pickled and the pages are shared with the parent until either side writes
+SHARDS: list[Shard] = []
+
+def load_shards(shards: list[Shard]) -> None:
+    """
+    Keeps the shards resident in the worker process.
+    """
+
+    global SHARDS
+    SHARDS = shards
+
+def substring_shard(task: tuple[int, tuple[str, ...]]) -> list[int]:
+    """
+    Returns the IDs of the books in a shard with a key containing any normalized form of the query.
+    """
+
+    shard_no, forms = task
+    matched: set[int] = set()
+
+    for key, _, ids in SHARDS[shard_no]:
+        if any(form in key for form in forms):
+            matched.update(ids)
+
+    return list(matched)
+
+def fuzzy_shard(task: tuple[int, str, int | None]) -> list[tuple[int, int]]:
+    """
+    Returns the best (score, ID) pairs in a shard for the normalized query, at most limit of them.
+    """
+
+    shard_no, query, limit = task
+    query_mask:  int            = char_mask(query)
+    best_scores: dict[int, int] = {}
+
+    for key, mask, ids in SHARDS[shard_no]:
+        if query_mask & mask != query_mask:
+            continue
+
+        key_score: int | None = score(query, key)
+
+        if key_score is None:
+            continue
+
+        for book_id in ids:
+            if key_score > best_scores.get(book_id, key_score - 1):
+                best_scores[book_id] = key_score
+
+    return [(best_scores[i], i) for i in top_k(best_scores, limit)]
+
+class ParallelSearcher:
+    """
+    Searches a library by splitting its title, author, and ISBN keys into shards which are held by
+    a pool of worker processes.
+    """
+
+    def __init__(self, library: Library, processes: int | None = None) -> None:
+        self.library:   Library     = library
+        self.processes: int         = processes or os.cpu_count() or 1
+        self.pool:      Pool | None = None
+        self.version:   int         = -1
+        self.size:      int         = 0
+
+    def shards(self) -> list[Shard]:
+        """
+        Splits every distinct key of the library into one shard per process.
+        """
+
+        library: Library = self.library
+
+        library.build_deferred()
+
+        shards: list[Shard] = [[] for _ in range(self.processes)]
+
+        for position, (key, (normalized, mask)) in enumerate(library.fuzzy_index.keys.items()):
+            ids: set[int] = set(library.index_from_title.get(key, ()))
+            ids.update(library.index_from_author.get(key, ()))
+
+            if key in library.index_from_isbn:
+                ids.add(library.index_from_isbn[key])
+
+            shards[position % self.processes].append((normalized, mask, tuple(ids)))
+
+        return shards
+
+    def refresh(self) -> None:
+        """
+        Restarts the pool with fresh shards if the library has changed since they were made.
+        """
+
+        if self.version == self.library.version:
+            return
+
+        self.close()
+        self.library.build_deferred()
+
+        self.version = self.library.version
+        self.size    = len(self.library.fuzzy_index.keys)
+
+        # A single worker only adds the cost of passing results between processes
+        if self.processes < 2 or self.size < PARALLEL_THRESHOLD:
+            return
+
+        shards: list[Shard] = self.shards()
+
+        # NOTE: 10/18/26 - fork shares the shards copy-on-write; platforms without it fall back to
+        #       spawn, which pickles the shards once per worker at startup
+        method: str = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+
+        self.pool = multiprocessing.get_context(method).Pool(self.processes,
+                                                             initializer=load_shards,
+                                                             initargs=(shards,))
+
+    def search_dict(self, query: str) -> list[Book]:
+        """
+        Returns a list of books with a title, author, or ISBN containing the query.
+        """
+
+        self.refresh()
+
+        if self.pool is None:
+            return self.library.search_dict(query)
+
+        forms:   tuple[str, ...]                   = query_forms(query)
+        tasks:   list[tuple[int, tuple[str, ...]]] = [(i, forms) for i in range(self.processes)]
+        matched: set[int]                          = set()
+
+        for ids in self.pool.imap_unordered(substring_shard, tasks):
+            matched.update(ids)
+
+        return [self.library.books[i] for i in sorted(matched)]
+
+    def search_fuzz(self, query: str, limit: int | None = None) -> list[Book]:
+        """
+        Returns a list of books matching the query, ranked by score, merged from every shard.
+        """
+
+        return [self.library.books[i] for i in top_k(self.fuzzy_scores(query, limit), limit)]
+
+    def fuzzy_scores(self, query: str, limit: int | None = None) -> dict[int, int]:
+        """
+        Returns the best score of every book matching the query using fuzzy finding, or of only
+        the best limit books of each shard if given, as Library.fuzzy_scores does.
+        """
+
+        self.refresh()
+
+        if self.pool is None:
+            return self.library.fuzzy_scores(query)
+
+        tasks: list[tuple[int, str, int | None]] = [(i, query_forms(query)[-1], limit)
+                                                    for i in range(self.processes)]
+
+        # A book can be matched in several shards through different keys, so keep its best score
+        best_scores: dict[int, int] = {}
+
+        for pairs in self.pool.imap_unordered(fuzzy_shard, tasks):
+            for key_score, book_id in pairs:
+                if key_score > best_scores.get(book_id, key_score - 1):
+                    best_scores[book_id] = key_score
+
+        return best_scores
+
+    def close(self) -> None:
+        """
+        Shuts down the worker processes.
+        """
+
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
@@ -5,12 +5,19 @@ Contains various prompts for interacting with the CLI.
 
 from pathlib import Path
 
+from rich.console import Console
 from rich.prompt import Confirm, Prompt
 
-import convert
 import helpers
+import instrument
+from background import BackgroundLibrary
 from book import Book
+from client import LibraryClient
 from library import Library
+from indexes import NUMERIC_FIELDS
+from query import Term, is_field_query, parse_range
+from report import ImportReport
+from results import LazyResults, ranked
 
 def prompt_add(library: Library) -> None:
     """
@@ -93,7 +100,7 @@ def prompt_edit(library: Library) -> None:
             if new_isbn.lower() == 'q':
                 break
 
-            if new_isbn in library.index_from_isbn:
+            if library.book_by_isbn(new_isbn) is not None:
                 status = f"ISBN: {new_isbn} already taken."
             else:
                 new_title: str = Prompt.ask("New title")
@@ -166,20 +173,81 @@ def prompt_list(library: Library) -> None:
     Prompts the user to list the books.
     """
 
-    books: list[Book] = library.books
+    books: LazyResults = library.listing()
+    empty: str         = "No books in library."
+
+    # Sorted listings are served page by page from the ordered indices of the in-memory library,
+    # or of the one hosted by the library server; a snapshot read while loading has none
+    if (isinstance(library, (Library, BackgroundLibrary, LibraryClient)) and books and
+        not (isinstance(library, BackgroundLibrary) and library.preloaded())):
+        choice: str = Prompt.ask(r"Order by \[t]itle, \[a]uthor, \[p]ublisher, \[y]ear, pa\[g]es, "
+                                 r"or \[i]nsertion", choices=['t', 'a', 'p', 'y', 'g', 'i'],
+                                 default='i')
+
+        name: str | None = {'t': "title", 'a': "author", 'p': "publisher", 'y': "year",
+                            'g': "pages"}.get(choice)
+
+        if name in NUMERIC_FIELDS:
+            bounds: str = Prompt.ask("Range, such as 1950..1960 or >1950 (blank for all)",
+                                     default="", show_default=False)
+
+            try:
+                term: Term = parse_range(name, bounds) if bounds else Term(name)
+            except ValueError as e:
+                helpers.print_error(str(e))
+                return
+
+            books = (library.books_in_range(name, term.low, term.high) if bounds
+                     else library.sorted_books(name))
+            empty = "No books found."
+        elif name is not None:
+            prefix: str = Prompt.ask("Starting with (blank for all)", default="",
+                                     show_default=False)
+
+            books = (library.books_with_prefix(name, prefix) if prefix
+                     else library.sorted_books(name))
+            empty = "No books found."
 
     if books:
         helpers.create_interactive_table(books)
     else:
-        helpers.print_info("No books in library.")
+        helpers.print_info(empty)
 
 def prompt_search(library: Library) -> None:
     """
     Prompts the user to search the books.
     """
 
-    query: str        = Prompt.ask("Search")
-    books: list[Book] = library.search_fuzz(query)
+    # Live search pulls in rich's live display, so it's only imported once a search is made
+    import live
+
+    query: str | None
+
+    # Live search works on the library's own indices, so it isn't offered while a snapshot stands in
+    if (isinstance(library, (Library, BackgroundLibrary)) and live.is_supported() and
+        not (isinstance(library, BackgroundLibrary) and library.preloaded())):
+        query = live.live_search(library)
+
+        if query is None:
+            return
+    else:
+        query = Prompt.ask("Search")
+
+    books: LazyResults
+
+    # Queries naming a field, such as author:tolkien year:>1950, are filtered through the field
+    # indices; anything else is a fuzzy search
+    if is_field_query(query):
+        try:
+            matches: list[Book] = library.query(query)
+        except ValueError as e:
+            helpers.print_error(str(e))
+            return
+
+        books = LazyResults(matches, len(matches))
+    else:
+        books = LazyResults(ranked(lambda limit: library.search(query, "fuzz", limit),
+                                   helpers.PAGE_SIZE + 1))
 
     helpers.clear_screen()
 
@@ -193,7 +261,11 @@ def prompt_convert(library: Library) -> None:
     Prompts the user to convert files.
     """
 
-    choice: str = Prompt.ask(r"\[i]mport, \[e]xport, \[q]uit", choices=['i', 'e', 'q'])
+    # The converters bring in every storage format, so they're only imported when needed
+    import convert
+
+    choice: str = Prompt.ask(r"\[i]mport, \[e]xport, \[d]atabase, \[s]napshot, \[q]uit",
+                             choices=['i', 'e', 'd', 's', 'q'])
 
     match choice:
         case 'i':
@@ -212,11 +284,16 @@ def prompt_convert(library: Library) -> None:
                 # NOTE: 07/26/24 - when no JSON file with the default file path is located and a CSV
                 #       is converted to a JSON with the default file path, ensure that the data is
                 #       loaded into the library
-                library.load_file(file_path_json)
+                # NOTE: 10/18/26 - the CSV is bulk imported directly instead of reloading the JSON
+                #       file that was just written
+                report: ImportReport = library.import_file(file_path_csv)
 
-                helpers.print_info(f"File {file_path_csv} imported to {file_path_json}.")
+                helpers.print_info(f"File {file_path_csv} imported to {file_path_json}. "
+                                   f"{report.summary()}")
             except FileNotFoundError:
                 helpers.print_warn(f"The {file_path_csv} file could not be located.")
+            except ValueError as e:
+                helpers.print_error(str(e))
 
         case 'e':
             file_name:      str  = Prompt.ask("JSON file name")
@@ -234,14 +311,68 @@ def prompt_convert(library: Library) -> None:
             except FileNotFoundError:
                 helpers.print_warn(f"The {file_path_json} file could not be located.")
 
+        case 'd':
+            file_name:      str  = Prompt.ask("JSON file name")
+            file_path_json: Path = Path(f"../data/{file_name}.json")
+            file_path_db:   Path = file_path_json.with_suffix(".db")
+
+            # If a database with the selected name already exists, don't overwrite it
+            if file_path_db.is_file():
+                helpers.print_warn(f"File {file_path_db} already exists. File not converted.")
+                return
+
+            try:
+                convert.json_to_db(file_path_db, file_path_json)
+                helpers.print_info(f"File {file_path_json} converted to {file_path_db}.")
+            except FileNotFoundError:
+                helpers.print_warn(f"The {file_path_json} file could not be located.")
+
+        case 's':
+            file_name:          str  = Prompt.ask("JSON file name")
+            file_path_json:     Path = Path(f"../data/{file_name}.json")
+            file_path_snapshot: Path = file_path_json.with_suffix(".snap")
+
+            # Snapshots are derived from the JSON file, so an existing one is simply rebuilt
+            try:
+                convert.json_to_snapshot(file_path_snapshot, file_path_json)
+                helpers.print_info(f"File {file_path_json} converted to {file_path_snapshot}.")
+            except FileNotFoundError:
+                helpers.print_warn(f"The {file_path_json} file could not be located.")
+
+def report_session() -> None:
+    """
+    Prints and writes out whatever instrumentation was recorded during the session.
+    """
+
+    for message in instrument.finish_session():
+        helpers.print_info(message)
+
 def prompt_quit(library: Library, file_path: Path) -> None:
     """
     Prompts the user to quit the program.
     """
 
+    # Every change has already been written to the journal, so there's nothing left to confirm
+    if isinstance(library, (Library, BackgroundLibrary)) and library.journal is not None:
+        compact: bool = Confirm.ask("Compact journal into library file", default=False)
+
+        with Console().status("Saving..."):
+            message: str = library.update_file(file_path, compact)
+
+        helpers.print_info(message)
+        report_session()
+        return
+
     save: bool = Confirm.ask("Save library", default=True)
 
     if save:
-        helpers.print_info(library.update_file(file_path))
+        # NOTE: 10/18/26 - in-memory libraries are written on a background thread, so the spinner
+        #       keeps turning for however long the disk takes
+        with Console().status("Saving..."):
+            message: str = library.update_file(file_path)
+
+        helpers.print_info(message)
     else:
         helpers.print_info("Library not saved.")
+
+    report_session()
@@ -0,0 +1,139 @@
+# module query
+"""
+Contains the parser for field queries such as: author:tolkien year:>1950 publisher:"allen"
+"""
+
+import re
+import shlex
+from dataclasses import dataclass, field as dataclass_field
+
+from book import Book, FIELDS, MISSING
+from indexes import NUMERIC_FIELDS, number
+from normalize import fold, normalize_key, query_forms
+
+# Fields searched by a term without a field name
+DEFAULT_FIELDS: tuple[str, ...] = ("title", "author", "isbn")
+
+COMPARISON: re.Pattern[str] = re.compile(r"(<=|>=|<|>|=)?(\d+)")
+RANGE:      re.Pattern[str] = re.compile(r"(\d+)\.\.(\d+)")
+
+@dataclass
+class Term:
+    """
+    One condition of a field query. Text terms match values containing the text, ignoring case
+    and accents, and numeric terms match values within an inclusive range; a field of None means
+    any of the default fields.
+    """
+
+    field: str | None
+    text:  str             = ""
+    low:   int | None      = None
+    high:  int | None      = None
+    forms: tuple[str, ...] = dataclass_field(init=False)
+
+    def __post_init__(self) -> None:
+        # The text is kept folded; an ISBN-like text also matches by its digits alone
+        self.forms = query_forms(self.text)
+        self.text  = self.forms[0]
+
+    @property
+    def numeric(self) -> bool:
+        """
+        Returns whether the term is a range of numbers.
+        """
+
+        return self.field in NUMERIC_FIELDS
+
+    def matches(self, book: Book) -> bool:
+        """
+        Returns whether the book satisfies the term. Missing values never match.
+        """
+
+        if self.field is None:
+            for name in DEFAULT_FIELDS:
+                key: str = normalize_key(getattr(book, name))
+
+                if any(form in key for form in self.forms):
+                    return True
+
+            return False
+
+        value: str = getattr(book, self.field)
+
+        if value == MISSING:
+            return False
+
+        if self.field == "isbn":
+            isbn: str = normalize_key(value)
+
+            return any(form in isbn for form in self.forms)
+
+        if not self.numeric:
+            return self.text in fold(value)
+
+        key: int | None = number(value)
+
+        return (key is not None and (self.low is None or key >= self.low) and
+                (self.high is None or key <= self.high))
+
+def parse_range(field: str, expression: str) -> Term:
+    """
+    Returns a numeric term from a comparison such as >1950 or <=300, a range such as 1950..1960,
+    or a single number.
+    """
+
+    if match := RANGE.fullmatch(expression):
+        return Term(field, low=int(match[1]), high=int(match[2]))
+
+    if match := COMPARISON.fullmatch(expression):
+        value: int = int(match[2])
+
+        match match[1]:
+            case '>':
+                return Term(field, low=value + 1)
+            case '>=':
+                return Term(field, low=value)
+            case '<':
+                return Term(field, high=value - 1)
+            case '<=':
+                return Term(field, high=value)
+            case _:
+                return Term(field, low=value, high=value)
+
+    raise ValueError(f"Invalid value for {field}: {expression}. Expected a number, a comparison "
+                     "such as >1950, or a range such as 1950..1960.")
+
+def parse(query: str) -> list[Term]:
+    """
+    Returns the terms of a field query, all of which must match. Raises a ValueError if the query
+    can't be parsed.
+    """
+
+    terms: list[Term] = []
+
+    for token in shlex.split(query):
+        field, separator, expression = token.partition(':')
+        field = field.lower()
+
+        # A colon after anything other than a field name is just part of the text
+        if not separator or field not in FIELDS:
+            terms.append(Term(None, token))
+            continue
+
+        if not expression:
+            raise ValueError(f"No value given for {field}.")
+
+        if field in NUMERIC_FIELDS:
+            terms.append(parse_range(field, expression))
+        else:
+            terms.append(Term(field, expression))
+
+    return terms
+
+def is_field_query(query: str) -> bool:
+    """
+    Returns whether the query names at least one field.
+    """
+
+    return any(token.partition(':')[0].lower() in FIELDS and ':' in token
+               for token in query.split())
@@ -0,0 +1,35 @@
+# module report
+"""
+Contains the implementation of the ImportReport class.
+"""
+
+from dataclasses import dataclass, field
+
+@dataclass
+class ImportReport:
+    """
+    The outcome of a bulk import.
+    """
+
+    read:       int       = 0
+    added:      int       = 0
+    duplicates: list[str] = field(default_factory=list)
+    conflicts:  list[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        """
+        Returns a one-line description of the import.
+        """
+
+        message: str = f"Added {self.added} of {self.read} books."
+
+        if self.duplicates:
+            message += f" Skipped {len(self.duplicates)} duplicates."
+
+        if self.conflicts:
+            shown: str = ", ".join(self.conflicts[:5])
+            more:  str = ", ..." if len(self.conflicts) > 5 else ""
+
+            message += f" Skipped {len(self.conflicts)} conflicting ISBNs: {shown}{more}."
+
+        return message
@@ -0,0 +1,91 @@
+# module results
+"""
+Contains the implementation of the LazyResults class.
+"""
+
+import math
+from typing import Callable, Iterable, Iterator
+
+from book import Book
+
+class LazyResults:
+    """
+    A sliceable sequence of books which only pulls as many results from its source as have been
+    requested so far. A window function, given two positions, returns the books between them
+    without pulling the ones before.
+    """
+
+    def __init__(self, source: Iterable[Book], length: int | None = None,
+                 window: Callable[[int, int], list[Book]] | None = None) -> None:
+        self.iterator:  Iterator[Book]                          = iter(source)
+        self.cache:     list[Book]                              = []
+        self.length:    int | None                              = length
+        self.exhausted: bool                                    = False
+        self.window:    Callable[[int, int], list[Book]] | None = window
+
+    def fetch(self, stop: float) -> None:
+        """
+        Pulls results from the source until at least stop of them are cached or it runs out.
+        """
+
+        while len(self.cache) < stop and not self.exhausted:
+            try:
+                self.cache.append(next(self.iterator))
+            except StopIteration:
+                self.exhausted = True
+                self.length    = len(self.cache)
+
+    def __getitem__(self, index: slice) -> list[Book]:
+        # NOTE: 10/18/26 - a source which can find books by position reads a page past everything
+        #       pulled so far straight from there, so jumping ahead doesn't pull the books before it
+        if (self.window is not None and index.start is not None and index.stop is not None and
+            index.step is None and index.start > len(self.cache) and not self.exhausted):
+            return self.window(index.start, index.stop)
+
+        self.fetch(math.inf if index.stop is None else index.stop)
+
+        return self.cache[index]
+
+    def __bool__(self) -> bool:
+        return self.has_more(0)
+
+    def has_more(self, start: int) -> bool:
+        """
+        Returns whether there is at least one result at or after the given position.
+        """
+
+        self.fetch(start + 1)
+
+        return len(self.cache) > start
+
+    def page_count(self, page_size: int) -> int | None:
+        """
+        Returns the number of pages if the total number of results is known.
+        """
+
+        if self.length is None:
+            return None
+
+        return math.ceil(self.length / page_size)
+
+def ranked(search: Callable[[int], list[Book]], first: int) -> Iterator[Book]:
+    """
+    Yields the results of a ranked search, asking for a growing number of top results only as
+    more of them are needed.
+    """
+
+    # NOTE: 10/18/26 - ties are broken deterministically by the search, so each larger top-k
+    #       starts with exactly the books which have already been yielded
+    limit: int = first
+    shown: int = 0
+
+    while True:
+        results: list[Book] = search(limit)
+
+        yield from results[shown:]
+
+        if len(results) < limit:
+            return
+
+        shown  = len(results)
+        limit *= 4
@@ -0,0 +1,243 @@
+# module server
+"""
+Contains the library server, which hosts one in-memory library on a Unix socket so that several
+terminals and scripts can share it without each parsing the file and building the indices.
+
+Requests and responses are JSON objects, one per line. A request names a method and its arguments,
+such as {"id": 1, "method": "search", "args": ["tolkien", "fuzz", 10]}, and is answered with
+{"id": 1, "result": ...} or {"id": 1, "error": "...", "type": "ValueError"}. Requests on one
+connection are answered in order, so clients may send several before reading any responses.
+"""
+
+import os
+import sys
+import json
+import signal
+import asyncio
+import argparse
+from pathlib import Path
+from functools import partial
+from dataclasses import asdict
+from typing import Any, Callable
+
+from book import Book
+from library import Library
+from results import LazyResults
+
+DEFAULT_FILE_PATH:   Path = Path("../data/library.json")
+DEFAULT_SOCKET_PATH: Path = Path("../data/library.sock")
+
+# Listings which may be paged through, and the library methods producing them
+SOURCES: frozenset[str] = frozenset({"listing", "sorted_books", "books_in_range",
+                                     "books_with_prefix"})
+
+def books_data(books: list[Book]) -> list[dict]:
+    """
+    Returns the books as dictionaries.
+    """
+
+    return [book.to_dict() for book in books]
+
+class LibraryServer:
+    """
+    Answers requests from any number of clients against one library. Requests are handled one at a
+    time on the event loop, so the library never sees concurrent changes.
+    """
+
+    def __init__(self, library: Library, file_path: Path) -> None:
+        self.library:   Library = library
+        self.file_path: Path    = file_path
+
+        self.methods: dict[str, Callable[..., Any]] = {
+            "count":           lambda: len(library.books),
+            "book_by_isbn":    self.book_by_isbn,
+            "books_by_title":  lambda title: books_data(library.books_by_title(title)),
+            "books_by_author": lambda author: books_data(library.books_by_author(author)),
+            "search_list":     lambda query: books_data(library.search_list(query)),
+            "search_dict":     lambda query: books_data(library.search_dict(query)),
+            "search_trigram":  lambda query: books_data(library.search_trigram(query)),
+            "search_fuzz":     lambda query, limit=None: books_data(library.search_fuzz(query,
+                                                                                       limit)),
+            "search":          lambda query, backend="fuzz", limit=None: books_data(
+                                   library.search(query, backend, limit)),
+            "query":           lambda query: books_data(library.query(query)),
+            "add_book":        lambda book: library.add_book(Book(**book)),
+            "edit_book":       lambda isbn, book: library.edit_book(self.existing(isbn),
+                                                                    Book(**book)),
+            "remove_book":     lambda isbn: library.remove_book(self.existing(isbn)),
+            "import_file":     lambda path: asdict(library.import_file(Path(path))),
+            "update_file":     lambda path=None: library.update_file(Path(path) if path
+                                                                     else self.file_path)
+        }
+
+    def book_by_isbn(self, isbn: str) -> dict | None:
+        """
+        Returns the book with the given ISBN as a dictionary, or None if there isn't one.
+        """
+
+        book: Book | None = self.library.book_by_isbn(isbn)
+
+        return None if book is None else book.to_dict()
+
+    def existing(self, isbn: str) -> Book:
+        """
+        Returns the book with the given ISBN. Raises a ValueError if there isn't one, which can
+        happen if another client removed it in the meantime.
+        """
+
+        book: Book | None = self.library.book_by_isbn(isbn)
+
+        if book is None:
+            raise ValueError(f"ISBN: {isbn} not found.")
+
+        return book
+
+    def page(self, listings: dict[tuple, tuple[int, LazyResults]], source: str, args: list,
+             start: int, stop: int) -> dict:
+        """
+        Returns the books between two positions of a listing, along with its length if known.
+        Listings are kept per connection in listings until the library changes.
+        """
+
+        if source not in SOURCES:
+            raise ValueError(f"Unknown listing {source}.")
+
+        # NOTE: 10/18/26 - the connection's listing is kept between pages, so paging through it
+        #       continues from the last page; pages further on are found by position, and only the
+        #       latest listing is kept so an idle connection holds at most one
+        key:    tuple                          = (source, *args)
+        cached: tuple[int, LazyResults] | None = listings.get(key)
+
+        if cached is None or cached[0] != self.library.version:
+            listings.clear()
+            cached = listings[key] = (self.library.version, getattr(self.library, source)(*args))
+
+        books: LazyResults = cached[1]
+
+        return {"books": books_data(books[start:stop]), "length": books.length}
+
+    def handle(self, request: dict, methods: dict[str, Callable[..., Any]] | None = None) -> dict:
+        """
+        Returns the response to a request, answered by the given methods, or by the methods any
+        connection shares if there are none.
+        """
+
+        response: dict = {"id": request.get("id")}
+
+        try:
+            method: Callable[..., Any] | None = (methods or self.methods).get(request.get("method"))
+
+            if method is None:
+                raise ValueError(f"Unknown method {request.get('method')}.")
+
+            response["result"] = method(*request.get("args", []))
+        except Exception as e:
+            response["error"] = str(e)
+            response["type"]  = type(e).__name__
+
+        return response
+
+    async def serve_client(self, reader: asyncio.StreamReader,
+                           writer: asyncio.StreamWriter) -> None:
+        """
+        Answers the requests of one connection in order until the client disconnects.
+        """
+
+        listings: dict[tuple, tuple[int, LazyResults]] = {}
+        methods:  dict[str, Callable[..., Any]]        = {**self.methods,
+                                                          "page": partial(self.page, listings)}
+
+        try:
+            while line := await reader.readline():
+                try:
+                    response: dict = self.handle(json.loads(line), methods)
+                except json.JSONDecodeError as e:
+                    response = {"id": None, "error": f"Invalid request: {e}", "type": "ValueError"}
+
+                # Only waits if the client has stopped reading, so pipelined requests already in
+                # the buffer are answered back to back
+                writer.write(json.dumps(response, ensure_ascii=False).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def run(self, socket_path: Path) -> None:
+        """
+        Serves clients on the socket until interrupted, then saves the library.
+        """
+
+        server: asyncio.Server = await asyncio.start_unix_server(self.serve_client,
+                                                                 path=str(socket_path))
+        stop:   asyncio.Event  = asyncio.Event()
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, stop.set)
+
+        print(f"Serving {self.file_path} on {socket_path}.")
+
+        async with server:
+            await stop.wait()
+
+        socket_path.unlink(missing_ok=True)
+
+        print(self.library.update_file(self.file_path))
+
+def server_running(socket_path: Path) -> bool:
+    """
+    Returns whether a server is accepting connections on the socket.
+    """
+
+    async def connect() -> bool:
+        try:
+            _, writer = await asyncio.open_unix_connection(str(socket_path))
+        except OSError:
+            return False
+
+        writer.close()
+
+        return True
+
+    return socket_path.exists() and asyncio.run(connect())
+
+def main() -> None:
+    """
+    Loads the library and serves it until interrupted.
+    """
+
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--file", type=Path, default=DEFAULT_FILE_PATH,
+                        help="library file to load and save")
+    parser.add_argument("--socket", type=Path, default=DEFAULT_SOCKET_PATH,
+                        help="path of the Unix socket to listen on")
+
+    args: argparse.Namespace = parser.parse_args()
+
+    if not hasattr(asyncio, "start_unix_server"):
+        sys.exit("Unix sockets aren't supported on this platform.")
+
+    if server_running(args.socket):
+        sys.exit(f"A server is already running on {args.socket}.")
+
+    # A socket left behind by a server which didn't shut down cleanly would block binding
+    args.socket.unlink(missing_ok=True)
+
+    library: Library = Library(args.file)
+
+    if args.file.is_file() and args.file.stat().st_size > 0:
+        print(library.load_file(args.file))
+
+    if os.environ.get("LIBTERM_JOURNAL") or args.file.with_suffix(".journal").is_file():
+        print(library.open_journal(args.file))
+
+    # Every index is built up front, once, instead of by the first client to need it
+    library.build_deferred()
+    library.build_ordered()
+
+    asyncio.run(LibraryServer(library, args.file).run(args.socket))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+# module snapshot
+"""
+Contains the binary snapshot format and the Snapshot class for reading it through mmap.
+"""
+
+import os
+import sys
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+from book import Book, FIELDS
+from fuzzy import score, top_k
+from normalize import normalize_key, query_forms
+from results import LazyResults
+
+# NOTE: 10/18/26 - layout, all integers little-endian and every section 8-byte aligned:
+#
+#       header          magic, book count, string count, field count, reserved, section offsets
+#       string offsets  (string count + 1) x u64 byte offsets into the string data
+#       string data     UTF-8 bytes of every distinct string, concatenated
+#       records         book count x field count x u32 string IDs
+#       indices         one section per INDEXED field: book count x u32 rows sorted by that field
+
+MAGIC:   bytes           = b"LIBTERM\x01"
+HEADER:  struct.Struct   = struct.Struct("<8sIIII6Q")
+INDEXED: tuple[str, ...] = ("title", "author", "isbn")
+
+def padding(size: int) -> bytes:
+    """
+    Returns the zero bytes needed to align a section of the given size to 8 bytes.
+    """
+
+    return b'\x00' * (-size % 8)
+
+def write_section(binary_file: BinaryIO, data: bytes | array) -> int:
+    """
+    Writes a section in little-endian order followed by its padding and returns the bytes written.
+    """
+
+    if isinstance(data, array):
+        if sys.byteorder != "little":
+            data.byteswap()
+
+        data = data.tobytes()
+
+    binary_file.write(data + padding(len(data)))
+
+    return len(data) + len(padding(len(data)))
+
+def write_snapshot(books: Iterable[Book], file_path: Path) -> None:
+    """
+    Writes the books, their string table, and prebuilt indices to a binary snapshot file.
+    """
+
+    string_id: dict[str, int] = {}
+    strings:   list[bytes]    = []
+    records:   array          = array('I')
+
+    for book in books:
+        for name in FIELDS:
+            value: str        = getattr(book, name)
+            sid:   int | None = string_id.get(value)
+
+            if sid is None:
+                sid = string_id[value] = len(strings)
+                strings.append(value.encode("utf-8"))
+
+            records.append(sid)
+
+    num_fields: int = len(FIELDS)
+    num_books:  int = len(records) // num_fields
+
+    offsets: array = array('Q', [0])
+    for data in strings:
+        offsets.append(offsets[-1] + len(data))
+
+    indices: list[array] = []
+    for name in INDEXED:
+        field: int = FIELDS.index(name)
+
+        # Sorting is stable, so rows with equal keys stay in ascending order
+        indices.append(array('I', sorted(range(num_books),
+                                         key=lambda row: strings[records[row * num_fields
+                                                                         + field]])))
+
+    # NOTE: 10/18/26 - other sessions may have the snapshot mapped, and truncating a mapped file
+    #       under them faults their reads, so a new file is written and swapped in as by atomic_dump
+    temp_path: Path = file_path.with_name(f".{file_path.name}.tmp")
+
+    with open(temp_path, 'wb') as binary_file:
+        binary_file.write(b'\x00' * HEADER.size)
+
+        section_offsets: list[int] = [HEADER.size]
+
+        for section in (offsets, b''.join(strings), records, *indices[:-1]):
+            section_offsets.append(section_offsets[-1] + write_section(binary_file, section))
+
+        write_section(binary_file, indices[-1])
+
+        binary_file.seek(0)
+        binary_file.write(HEADER.pack(MAGIC, num_books, len(strings), num_fields, 0,
+                                      *section_offsets))
+        binary_file.flush()
+        os.fsync(binary_file.fileno())
+
+    os.replace(temp_path, file_path)
+
+class Snapshot:
+    """
+    A read-only library backed by a memory-mapped snapshot file. Books are decoded only when
+    accessed, and concurrent sessions share the same pages of the OS page cache.
+    """
+
+    def __init__(self, file_path: Path) -> None:
+        self.file_path: Path = file_path
+
+        with open(file_path, 'rb') as binary_file:
+            self.map: mmap.mmap = mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.num_books, num_strings, num_fields, _, *section_offsets = \
+            HEADER.unpack_from(self.map)
+
+        if magic != MAGIC or num_fields != len(FIELDS) or sys.byteorder != "little":
+            self.map.close()
+            raise ValueError(f"File {file_path} is not a compatible snapshot.")
+
+        offsets_start, data_start, records_start, *index_starts = section_offsets
+
+        view:         memoryview = memoryview(self.map)
+        records_size: int        = self.num_books * num_fields * 4
+        index_size:   int        = self.num_books * 4
+
+        self.offsets: memoryview = view[offsets_start:data_start].cast('Q')
+        self.data:    memoryview = view[data_start:records_start]
+        self.records: memoryview = view[records_start:records_start + records_size].cast('I')
+
+        self.indices: dict[str, memoryview] = {name: view[start:start + index_size].cast('I')
+                                               for name, start in zip(INDEXED, index_starts)}
+
+        view.release()
+
+    def __len__(self) -> int:
+        return self.num_books
+
+    def __iter__(self) -> Iterator[Book]:
+        return (self.book(row) for row in range(self.num_books))
+
+    def string(self, sid: int) -> str:
+        """
+        Decodes the string with the given ID.
+        """
+
+        return str(self.data[self.offsets[sid]:self.offsets[sid + 1]], "utf-8")
+
+    def value(self, row: int, name: str) -> str:
+        """
+        Decodes a single field of the book at the given row.
+        """
+
+        return self.string(self.records[row * len(FIELDS) + FIELDS.index(name)])
+
+    def book(self, row: int) -> Book:
+        """
+        Decodes the book at the given row.
+        """
+
+        start: int = row * len(FIELDS)
+
+        return Book(*(self.string(sid) for sid in self.records[start:start + len(FIELDS)]))
+
+    def rows_by(self, name: str, value: str) -> list[int]:
+        """
+        Returns the rows whose field equals the value using a binary search over the field's index.
+        """
+
+        index:  memoryview = self.indices[name]
+        field:  int        = FIELDS.index(name)
+        target: bytes      = value.encode("utf-8")
+
+        def key(row: int) -> bytes:
+            sid: int = self.records[row * len(FIELDS) + field]
+            return self.data[self.offsets[sid]:self.offsets[sid + 1]].tobytes()
+
+        rows: list[int] = []
+
+        for position in range(bisect_left(index, target, key=key), len(index)):
+            if key(index[position]) != target:
+                break
+
+            rows.append(index[position])
+
+        return rows
+
+    @property
+    def books(self) -> dict[int, Book]:
+        """
+        Returns every book in the snapshot keyed by its row.
+        """
+
+        return {row: self.book(row) for row in range(self.num_books)}
+
+    def books_by_title(self, title: str) -> list[Book]:
+        """
+        Returns a list of books with the given title.
+        """
+
+        return [self.book(row) for row in self.rows_by("title", title)]
+
+    def books_by_author(self, author: str) -> list[Book]:
+        """
+        Returns a list of books with the given author.
+        """
+
+        return [self.book(row) for row in self.rows_by("author", author)]
+
+    def book_by_isbn(self, isbn: str) -> Book | None:
+        """
+        Returns the book with the given ISBN.
+        """
+
+        rows: list[int] = self.rows_by("isbn", isbn)
+
+        return self.book(rows[0]) if rows else None
+
+    def listing(self) -> LazyResults:
+        """
+        Returns every book in the order added, decoding only the books shown.
+        """
+
+        return LazyResults(iter(self), self.num_books,
+                           lambda first, last: [self.book(row) for row in
+                                                range(first, min(last, self.num_books))])
+
+    def search_list(self, query: str) -> list[Book]:
+        """
+        Returns a list of books matching the query. Decodes only the searched fields of each book.
+        """
+
+        # Normalized as the library's keys are, so "cafe" finds "Café" and 978-0-12 finds 978012
+        forms: tuple[str, ...] = query_forms(query)
+
+        return [self.book(row) for row in range(self.num_books)
+                if any(form in normalize_key(self.value(row, name))
+                       for name in INDEXED for form in forms)]
+
+    def search_fuzz(self, query: str, limit: int | None = None) -> list[Book]:
+        """
+        Returns a list of books matching the query, ranked by score, using fuzzy finding.
+        """
+
+        # Normalized as the library's fuzzy index does, so searches match regardless of accents
+        normalized:  str            = query_forms(query)[-1]
+        best_scores: dict[int, int] = {}
+
+        for row in range(self.num_books):
+            key_scores: list[int] = [key_score for name in INDEXED if (key_score := score(
+                                     normalized, normalize_key(self.value(row, name))))
+                                     is not None]
+
+            if key_scores:
+                best_scores[row] = max(key_scores)
+
+        return [self.book(row) for row in top_k(best_scores, limit)]
+
+    def search(self, query: str, backend: str = "fuzz", limit: int | None = None) -> list[Book]:
+        """
+        Returns a list of books matching the query as Library.search does. Every backend other
+        than fuzzy finding returns the same books in the order added, so they all scan the list.
+        """
+
+        if backend == "fuzz":
+            return self.search_fuzz(query, limit)
+
+        return self.search_list(query)[:limit]
+
+    def close(self) -> None:
+        """
+        Releases the views into the file and unmaps it.
+        """
+
+        for view in (self.offsets, self.data, self.records, *self.indices.values()):
+            view.release()
+
+        self.map.close()
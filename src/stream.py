@@ -0,0 +1,175 @@
+# module stream
+"""
+Contains functions for reading and writing records one at a time without holding the whole file in
+memory.
+"""
+
+import csv
+import json
+from pathlib import Path
+from typing import Iterable, Iterator, TextIO
+
+from book import FIELDS, MISSING
+
+CHUNK_SIZE: int = 1 << 16
+
+REQUIRED: tuple[str, ...] = ("title", "author", "isbn")
+
+WHITESPACE: str = " \t\n\r"
+
+def iter_json_array(json_file: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Yields each element of a top-level JSON array while holding at most one element (plus one
+    chunk) of the file in memory.
+    """
+
+    decoder: json.JSONDecoder = json.JSONDecoder()
+    buffer:  str              = ""
+    index:   int              = 0
+    eof:     bool             = False
+
+    def fill() -> bool:
+        nonlocal buffer, index, eof
+
+        chunk: str = json_file.read(chunk_size)
+
+        if not chunk:
+            eof = True
+            return False
+
+        # Drop whatever has already been consumed so the buffer never grows past one record
+        buffer = buffer[index:] + chunk
+        index  = 0
+
+        return True
+
+    def skip_whitespace() -> str:
+        nonlocal index
+
+        while True:
+            while index < len(buffer) and buffer[index] in WHITESPACE:
+                index += 1
+
+            if index < len(buffer):
+                return buffer[index]
+
+            if not fill():
+                raise json.JSONDecodeError("Expecting value", buffer, index)
+
+    if skip_whitespace() != '[':
+        raise json.JSONDecodeError("Expecting '['", buffer, index)
+
+    index += 1
+
+    if skip_whitespace() == ']':
+        return
+
+    while True:
+        skip_whitespace()
+
+        try:
+            record, end = decoder.raw_decode(buffer, index)
+        except json.JSONDecodeError:
+            # The record may just be cut off at the end of the buffer, so read more and retry
+            if eof or not fill():
+                raise
+
+            continue
+
+        index = end
+
+        yield record
+
+        match skip_whitespace():
+            case ',':
+                index += 1
+            case ']':
+                return
+            case _:
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, index)
+
+def iter_json_lines(json_file: TextIO) -> Iterator[dict]:
+    """
+    Yields each non-empty line of a JSON Lines file as a record.
+    """
+
+    for line in json_file:
+        if line.strip():
+            yield json.loads(line)
+
+def iter_records(file_path: Path) -> Iterator[dict]:
+    """
+    Yields each record of a JSON array or JSON Lines file, detected from its first character. The
+    file is opened immediately, so a missing file raises before iteration starts.
+    """
+
+    json_file: TextIO = open(file_path, 'r', encoding="utf-8", buffering=CHUNK_SIZE)
+
+    def records() -> Iterator[dict]:
+        with json_file:
+            first: str = json_file.read(1)
+
+            while first and first in WHITESPACE:
+                first = json_file.read(1)
+
+            json_file.seek(0)
+
+            if first == '{':
+                yield from iter_json_lines(json_file)
+            else:
+                yield from iter_json_array(json_file)
+
+    return records()
+
+def iter_csv(file_path: Path) -> Iterator[dict]:
+    """
+    Yields each row of a CSV file as a record with every Book field, filling in optional columns
+    which are missing or empty. Raises a ValueError if a required column is missing.
+    """
+
+    csv_file: TextIO    = open(file_path, 'r', encoding="utf-8", newline='', buffering=CHUNK_SIZE)
+    reader:   Iterator  = csv.reader(csv_file)
+    header:   list[str] = next(reader, [])
+
+    missing: list[str] = [name for name in REQUIRED if name not in header]
+
+    if missing:
+        csv_file.close()
+        raise ValueError(f"CSV file {file_path} is missing required columns: "
+                         f"{', '.join(missing)}.")
+
+    # Columns are looked up by position once instead of building a dict per row
+    columns: list[tuple[str, int, str]] = [(name, header.index(name) if name in header else -1,
+                                            "" if name in REQUIRED else MISSING)
+                                           for name in FIELDS]
+
+    def records() -> Iterator[dict]:
+        with csv_file:
+            for row in reader:
+                if not row:
+                    continue
+
+                yield {name: (row[column] if 0 <= column < len(row) else "") or default
+                       for name, column, default in columns}
+
+    return records()
+
+def write_json_array(records: Iterable[dict], file_path: Path) -> int:
+    """
+    Writes records to a JSON file one at a time, formatted exactly as json.dump with an indent of
+    four, and returns the number of records written.
+    """
+
+    count: int = 0
+
+    with open(file_path, 'w', encoding="utf-8", buffering=CHUNK_SIZE) as json_file:
+        for record in records:
+            # Indenting the record's own lines nests it inside the top-level array
+            json_file.write(",\n    " if count else "[\n    ")
+            json_file.write(json.dumps(record, indent=4).replace('\n', "\n    "))
+
+            count += 1
+
+        json_file.write("\n]" if count else "[]")
+
+    return count
@@ -0,0 +1,80 @@
+# module trigram
+"""
+Contains the implementation of the TrigramIndex class.
+"""
+
+from collections import defaultdict
+
+from normalize import query_forms
+
+def trigrams(text: str) -> set[str]:
+    """
+    Returns the set of trigrams contained in the text.
+    """
+
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class TrigramIndex:
+    """
+    An inverted index from trigrams to the IDs of the books whose keys contain them.
+    """
+
+    def __init__(self) -> None:
+        self.postings: defaultdict[str, set[int]] = defaultdict(set)
+
+    def add(self, book_id: int, *keys: str) -> None:
+        """
+        Adds the trigrams of each key to the postings of the given book. Keys are expected to be
+        normalized.
+        """
+
+        for key in keys:
+            for trigram in trigrams(key):
+                self.postings[trigram].add(book_id)
+
+    def remove(self, book_id: int, *keys: str) -> None:
+        """
+        Removes the given book from the postings of each trigram in the keys.
+        """
+
+        for key in keys:
+            for trigram in trigrams(key):
+                postings: set[int] | None = self.postings.get(trigram)
+
+                if postings is None:
+                    continue
+
+                postings.discard(book_id)
+                if not postings:
+                    del self.postings[trigram]
+
+    def candidates(self, query: str) -> set[int] | None:
+        """
+        Returns the IDs of the books which may contain any normalized form of the query, or None if
+        the query is too short to be filtered by trigrams and every book is a candidate.
+        """
+
+        result: set[int] = set()
+
+        # A book matching any form of the query is a candidate
+        for form in query_forms(query):
+            query_trigrams: set[str] = trigrams(form)
+
+            if not query_trigrams:
+                return None
+
+            # Intersect the smallest postings first so the working set shrinks as fast as possible
+            postings: list[set[int]] = sorted((self.postings.get(t, set()) for t in query_trigrams),
+                                              key=len)
+
+            matches: set[int] = set(postings[0])
+
+            for posting in postings[1:]:
+                if not matches:
+                    break
+
+                matches &= posting
+
+            result |= matches
+
+        return result
@@ -0,0 +1,380 @@
+# module bench
+"""
+Benchmarks the library at several scales and saves the results as JSON.
+
+Usage: python bench.py [--scales 1000,10000,100000] [--output results.json] [--compare old.json]
+"""
+
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import subprocess
+import platform
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+from dataclasses import make_dataclass
+
+SRC_DIR: Path = Path(__file__).resolve().parent.parent / "src"
+
+sys.path.append(str(SRC_DIR))
+
+import convert
+from book import Book, FIELDS
+from library import Library
+from parallel import ParallelSearcher
+
+WORDS: list[str] = ["the", "of", "and", "night", "river", "shadow", "garden", "history", "house",
+                    "war", "peace", "stars", "winter", "letters", "kingdom", "silence", "city",
+                    "café", "naïve", "résumé", "Straße", "Ærø", "città", "niño", "Ελλάδα",
+                    "Москва", "東京", "物語", "سلام", "księga"]
+
+CATEGORIES: list[str] = ["fiction", "history", "science", "poetry", "philosophy", "biography"]
+COVERS:     list[str] = ["hardcover", "paperback", "-"]
+
+QUERIES: list[str] = ["river", "the night", "café", "東京", "978", "zzzz"]
+
+FIELD_QUERIES: list[str] = ["year:1990..1999", "author:river year:>1950", "category:poetry night",
+                            'publisher:"publisher 1" pages:<100', "year:2000 pages:>=1000"]
+
+# Latency an interactive fuzzy search for the top 10 books was asked to stay under, in seconds
+FUZZY_TARGET: float = 0.005
+
+# Fraction by which a benchmark may be slower than in the compared run before it's a regression,
+# ignoring benchmarks too short to time reliably
+THRESHOLD:   float = 0.25
+NOISE_FLOOR: float = 0.005
+
+def isbn13(number: int) -> str:
+    """
+    Returns a valid ISBN-13 for the given number.
+    """
+
+    digits: str = f"978{number:09d}"
+    check:  int = -sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10
+
+    return digits + str(check)
+
+def generate_books(count: int, seed: int = 0) -> list[Book]:
+    """
+    Returns a list of books with Unicode titles and Zipf-distributed authors and publishers.
+    """
+
+    rng: random.Random = random.Random(seed)
+
+    num_authors:     int         = max(count // 10, 1)
+    author_weights:  list[float] = [1 / (rank + 1) for rank in range(num_authors)]
+    authors:         list[str]   = rng.choices([f"{rng.choice(WORDS).title()} Author {i}"
+                                                for i in range(num_authors)],
+                                               weights=author_weights, k=count)
+    publisher_names: list[str]   = [f"Publisher {i}" for i in range(50)]
+    publishers:      list[str]   = rng.choices(publisher_names,
+                                               weights=[1 / (r + 1) for r in range(50)], k=count)
+
+    return [Book(" ".join(rng.choices(WORDS, k=rng.randint(1, 6))).capitalize() + f" {i}",
+                 authors[i], isbn13(i), category=rng.choice(CATEGORIES), cover=rng.choice(COVERS),
+                 pages=str(rng.randint(50, 1200)), publisher=publishers[i],
+                 year=str(rng.randint(1850, 2025)))
+            for i in range(count)]
+
+def filled(books: list[Book]) -> Library:
+    """
+    Returns a library containing the given books.
+    """
+
+    library: Library = Library()
+
+    for book in books:
+        library.add_book(book)
+
+    return library
+
+def benchmarks(books: list[Book], work_dir: Path) -> dict[str, tuple[Callable, Callable, int]]:
+    """
+    Returns each benchmark as a setup function, a function run on the result of setup, and the
+    number of operations performed by the run.
+    """
+
+    rng:    random.Random = random.Random(1)
+    sample: list[Book]    = rng.sample(books, min(len(books), 1000))
+    isbns:  list[str]     = [book.isbn for book in sample]
+
+    file_json: Path = work_dir / "library.json"
+    file_csv:  Path = work_dir / "library.csv"
+    file_out:  Path = work_dir / "out.json"
+
+    file_csv_out: Path = work_dir / "out.csv"
+
+    # Same books as file_json, but without a snapshot, so commands on it stream the file
+    file_plain: Path = work_dir / "plain.json"
+
+    filled(books).update_file(file_json)
+    filled(books).update_file(file_plain)
+    convert.json_to_csv(file_csv, file_json)
+    convert.json_to_snapshot(file_json.with_suffix(".snap"), file_json)
+
+    def edit(library: Library) -> None:
+        for book in sample:
+            library.edit_book(book, Book(book.title + " (revised)", book.author, book.isbn + "-r"))
+
+    def remove(library: Library) -> None:
+        for book in sample:
+            library.remove_book(book)
+
+    def lookup(library: Library) -> None:
+        for isbn in isbns:
+            library.book_by_isbn(isbn)
+
+    def search(backend: str) -> Callable[[Library], None]:
+        def run(library: Library) -> None:
+            # The backend is called directly so every repeat scans instead of hitting the cache
+            for query in QUERIES:
+                getattr(library, f"search_{backend}")(query)
+
+        return run
+
+    def top10(library: Library) -> None:
+        for query in QUERIES:
+            library.search_fuzz(query, 10)
+
+    def field_query(library: Library) -> None:
+        for query in FIELD_QUERIES:
+            library.query(query)
+
+    def typing(library: Library) -> None:
+        # Each query is searched one keystroke at a time, as a user refining it would
+        for query in QUERIES:
+            for end in range(1, len(query) + 1):
+                library.search(query[:end], "fuzz", 20)
+
+    def uncached() -> Library:
+        built.cache.clear()
+        return built
+
+    def save(library: Library) -> None:
+        file_out.unlink(missing_ok=True)
+        library.update_file(file_out)
+
+    def python(*args: str) -> Callable[[None], None]:
+        # Startup is measured as a whole process, interpreter included, as a script would see it
+        def run(_) -> None:
+            subprocess.run([sys.executable, *args], cwd=SRC_DIR, check=True,
+                           stdout=subprocess.DEVNULL)
+
+        return run
+
+    def warmed() -> ParallelSearcher:
+        # The pool is started once, outside the timing, as it would be by a long-running session
+        searcher.refresh()
+        return searcher
+
+    built:    Library          = filled(books)
+    searcher: ParallelSearcher = ParallelSearcher(built)
+
+    return {
+        "add_book":       (lambda: None,          lambda _: filled(books),  len(books)),
+        "add_books":      (Library,               lambda library: library.add_books(books),
+                           len(books)),
+        "import_csv":     (Library,               lambda library: library.import_file(file_csv),
+                           len(books)),
+        "book_by_isbn":   (lambda: built,         lookup,                   len(isbns)),
+        "edit_book":      (lambda: filled(books), edit,                     len(sample)),
+        "remove_book":    (lambda: filled(books), remove,                   len(sample)),
+        "search_list":    (lambda: built,         search("list"),           len(QUERIES)),
+        "search_dict":    (lambda: built,         search("dict"),           len(QUERIES)),
+        "search_trigram": (lambda: built,         search("trigram"),        len(QUERIES)),
+        "search_fuzz":    (lambda: built,         search("fuzz"),           len(QUERIES)),
+        "fuzz_top10":     (lambda: built,         top10,                    len(QUERIES)),
+        "parallel_dict":  (warmed,                search("dict"),           len(QUERIES)),
+        "parallel_fuzz":  (warmed,                search("fuzz"),           len(QUERIES)),
+        "search_typing":  (uncached,              typing,                   len(QUERIES)),
+        "field_query":    (lambda: built,         field_query,              len(FIELD_QUERIES)),
+        "load_file":      (Library,               lambda library: library.load_file(file_json),
+                           len(books)),
+        "update_file":    (lambda: built,         save,                     len(books)),
+        "csv_to_json":    (lambda: None,          lambda _: convert.csv_to_json(file_csv,
+                                                                                file_out),
+                           len(books)),
+        "json_to_csv":    (lambda: None,          lambda _: convert.json_to_csv(file_csv_out,
+                                                                                file_json),
+                           len(books)),
+        "startup_python": (lambda: None,          python("-c", "pass"),     1),
+        "import_cli":     (lambda: None,          python("-c", "import main, prompts"),
+                           1),
+        "cli_lookup":     (lambda: None,          python("main.py", "--file", str(file_json),
+                                                         "lookup", isbns[0]),
+                           1),
+        "cli_streamed":   (lambda: None,          python("main.py", "--file", str(file_plain),
+                                                         "lookup", isbns[0]),
+                           1),
+        "cli_search":     (lambda: None,          python("main.py", "--file", str(file_json),
+                                                         "search", QUERIES[0]),
+                           1),
+    }
+
+def measure(setup: Callable, run: Callable, repeat: int, memory: bool) -> tuple[float, int | None]:
+    """
+    Returns the best time over the repeats and, optionally, the peak memory allocated by one run.
+    """
+
+    best: float = float("inf")
+
+    for _ in range(repeat):
+        state: Any = setup()
+
+        gc.collect()
+        start: float = time.perf_counter()
+        run(state)
+        best = min(best, time.perf_counter() - start)
+
+    if not memory:
+        return best, None
+
+    # Tracing slows everything down, so memory is measured in its own run
+    state = setup()
+    gc.collect()
+    tracemalloc.start()
+    run(state)
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best, peak
+
+def book_footprint(count: int) -> dict[str, float]:
+    """
+    Returns the bytes retained per book, strings included, for Book and for a plain dataclass.
+    """
+
+    # Same fields as Book, but without slots or interning
+    plain_book = make_dataclass("PlainBook", [(name, str, "-") for name in FIELDS])
+
+    lines: list[str] = [json.dumps(book.to_dict()) for book in generate_books(count)]
+
+    footprint: dict[str, float] = {}
+
+    for name, book_class in (("plain", plain_book), ("book", Book)):
+        gc.collect()
+
+        # Decoding inside the traced section gives every book fresh strings, as load_file does
+        tracemalloc.start()
+        books: list = [book_class(**json.loads(line)) for line in lines]
+        footprint[name] = tracemalloc.get_traced_memory()[0] / len(books)
+        tracemalloc.stop()
+
+        del books
+
+    return footprint
+
+def speedups(results: list[dict]) -> None:
+    """
+    Prints how many times faster each parallel search is than the same search run serially.
+    """
+
+    seconds: dict[tuple[str, int], float] = {(r["name"], r["scale"]): r["seconds"]
+                                             for r in results}
+
+    print("\nParallel speedup over serial search:")
+
+    for (name, scale), parallel in seconds.items():
+        if name.startswith("parallel_"):
+            serial: float = seconds[("search_" + name.removeprefix("parallel_"), scale)]
+            print(f"{name:<16}{scale:>9}  {serial / parallel:6.2f}x")
+
+def latency(results: list[dict]) -> None:
+    """
+    Prints the mean latency of a fuzzy search for the top 10 books against the target.
+    """
+
+    print(f"\nFuzzy top-10 latency against the {FUZZY_TARGET * 1000:.0f} ms target:")
+
+    for result in results:
+        if result["name"] == "fuzz_top10":
+            per_query: float = result["per_op"]
+            print(f"{result['scale']:>9} books  {per_query * 1000:8.1f} ms  "
+                  f"{per_query / FUZZY_TARGET:6.1f}x the target")
+
+def compare(results: list[dict], file_path: Path) -> bool:
+    """
+    Prints the change against a previous run and returns whether any benchmark regressed.
+    """
+
+    with open(file_path, 'r', encoding="utf-8") as json_file:
+        previous: dict[tuple[str, int], dict] = {(r["name"], r["scale"]): r
+                                                 for r in json.load(json_file)["results"]}
+
+    regressed: bool = False
+
+    print(f"\nCompared to {file_path}:")
+
+    for result in results:
+        old: dict | None = previous.get((result["name"], result["scale"]))
+
+        if old is None:
+            continue
+
+        ratio: float = result["seconds"] / old["seconds"]
+        flag:  str   = ""
+
+        if ratio > 1 + THRESHOLD and result["seconds"] > NOISE_FLOOR:
+            regressed = True
+            flag      = "  REGRESSION"
+
+        print(f"{result['name']:<16}{result['scale']:>9}  {ratio:6.2f}x{flag}")
+
+    return regressed
+
+def main() -> None:
+    """
+    Runs the benchmarks.
+    """
+
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales",    default="1000,10000,100000",
+                        help="comma-separated library sizes, up to 1000000")
+    parser.add_argument("--repeat",    type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument("--output",    type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--compare",   type=Path, help="previous results to check for regressions")
+    parser.add_argument("--no-memory", action="store_true", help="skip memory measurements")
+    args: argparse.Namespace = parser.parse_args()
+
+    results: list[dict] = []
+
+    print(f"{'benchmark':<16}{'books':>9}{'total (s)':>12}{'per op (s)':>14}{'peak (MiB)':>12}")
+
+    for scale in map(int, args.scales.split(',')):
+        books: list[Book] = generate_books(scale)
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            for name, (setup, run, ops) in benchmarks(books, Path(work_dir)).items():
+                seconds, peak = measure(setup, run, args.repeat, not args.no_memory)
+
+                results.append({"name": name, "scale": scale, "ops": ops, "seconds": seconds,
+                                "per_op": seconds / ops, "peak_bytes": peak})
+
+                peak_mib: str = "-" if peak is None else f"{peak / (1 << 20):.1f}"
+                print(f"{name:<16}{scale:>9}{seconds:>12.4f}{seconds / ops:>14.8f}{peak_mib:>12}")
+
+    speedups(results)
+    latency(results)
+
+    footprint: dict[str, float] = book_footprint(10000)
+
+    print(f"\nBook footprint: {footprint['book']:.1f} bytes, plain dataclass: "
+          f"{footprint['plain']:.1f} bytes ({footprint['plain'] / footprint['book']:.1f}x smaller)")
+
+    with open(args.output, 'w', encoding="utf-8") as json_file:
+        json.dump({"python": platform.python_version(), "platform": platform.platform(),
+                   "timestamp": time.time(), "book_footprint": footprint, "results": results},
+                  json_file, indent=4)
+
+    print(f"\nResults saved to {args.output}.")
+
+    if args.compare is not None and compare(results, args.compare):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+# module test_library
+"""
+Checks the behaviour of the library which the benchmarks rely on: that the search backends agree,
+that field queries, ordered indices, streaming readers, imports, and the query cache return what a
+plain scan would, that the database and the commands answer like the library, that the journal
+survives a crash, that sessions merge each other's saves, and that snapshots keep every book.
+
+Usage: python -m pytest test_library.py, or python test_library.py
+"""
+
+import io
+import sys
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from contextlib import redirect_stderr, redirect_stdout
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+import commands
+import indexes
+from book import Book, MISSING
+from cache import QueryCache
+from database import DatabaseLibrary
+from indexes import SortedIndex
+from journal import Journal
+from library import Library
+from query import Term, is_field_query, parse
+from snapshot import Snapshot, write_snapshot
+from stream import iter_csv, iter_json_array, iter_records, write_json_array
+
+BOOKS: list[Book] = [Book("The Night Garden", "Ana River", "9780000000001"),
+                     Book("Café Stories", "Jean Dupont", "9780000000002"),
+                     Book("A History of Rivers", "Mara Stone", "9780000000003"),
+                     Book("Winter Letters", "Ana River", "9780000000004"),
+                     Book("東京物語", "小津安二郎", "9780000000005"),
+                     Book("Naïve Kingdom", "Ivo Šimić", "9780000000006")]
+
+QUERIES: list[str] = ["river", "night", "RIVER", "ana", "978", "0004", "東京", "kingdom", "zzzz"]
+
+# Books with every kind of field a query can name, some of them missing
+FIELD_BOOKS: list[Book] = [Book(f"{('Night', 'Garden', 'River', 'Café', 'Winter')[i % 5]} {i}",
+                                ("Ana River", "Jean Dupont", "Mara Stone")[i % 3],
+                                f"979000000{i:04d}",
+                                category=("poetry", "history", MISSING)[i % 3],
+                                pages=str(50 + 37 * i % 900),
+                                publisher=f"Publisher {i % 4}" if i % 7 else MISSING,
+                                year=str(1940 + i % 70) if i % 9 else MISSING)
+                           for i in range(120)]
+
+FIELD_QUERIES: list[str] = ["year:1950..1970", "year:>2000 author:river", "author:river year:>2000",
+                            'publisher:"publisher 1" pages:<300', "category:poetry night",
+                            "title:garden year:1960", "isbn:979-000-0000-01", "café pages:>=800",
+                            "publisher:publisher category:history", "zzzz year:1950",
+                            "year:<1941", "pages:=87"]
+
+class TempDirTestCase(unittest.TestCase):
+    """
+    A test case with a temporary directory for its files.
+    """
+
+    def setUp(self) -> None:
+        temp_dir: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+
+        self.dir: Path = Path(temp_dir.name)
+
+class TestSearch(unittest.TestCase):
+    def test_backends_agree(self) -> None:
+        library: Library = Library()
+        library.add_books(BOOKS)
+
+        for query in QUERIES:
+            expected: set[str] = {book.isbn for book in library.search_list(query)}
+
+            with self.subTest(query=query):
+                self.assertEqual({book.isbn for book in library.search_dict(query)}, expected)
+                self.assertEqual({book.isbn for book in library.search_trigram(query)}, expected)
+
+    def test_backends_agree_after_changes(self) -> None:
+        library: Library = Library()
+        library.add_books(BOOKS)
+
+        library.remove_book(BOOKS[0])
+        library.edit_book(BOOKS[1], Book("River Café", "Jean Dupont", "9780000000002"))
+
+        for query in QUERIES:
+            expected: set[str] = {book.isbn for book in library.search_list(query)}
+
+            with self.subTest(query=query):
+                self.assertEqual({book.isbn for book in library.search_dict(query)}, expected)
+                self.assertEqual({book.isbn for book in library.search_trigram(query)}, expected)
+
+class TestQuery(unittest.TestCase):
+    def test_parse(self) -> None:
+        terms: list[Term] = parse('Author:Tolkien year:>1950 publisher:"Allen Unwin" re:zero')
+
+        self.assertEqual([(term.field, term.text) for term in terms],
+                         [("author", "tolkien"), ("year", ""), ("publisher", "allen unwin"),
+                          (None, "re:zero")])
+        self.assertEqual((terms[1].low, terms[1].high), (1951, None))
+
+        for expression, bounds in (("1950..1960", (1950, 1960)), (">=10", (10, None)),
+                                   ("<10", (None, 9)), ("<=10", (None, 10)), ("10", (10, 10))):
+            with self.subTest(expression=expression):
+                term: Term = parse(f"pages:{expression}")[0]
+                self.assertEqual((term.low, term.high), bounds)
+
+        self.assertEqual(parse("isbn:978-0-12")[0].forms, ("978-0-12", "978012"))
+
+        for query in ("title:", "year:abc", "pages:1950-1960"):
+            with self.subTest(query=query), self.assertRaises(ValueError):
+                parse(query)
+
+        self.assertTrue(is_field_query("river year:1990"))
+        self.assertFalse(is_field_query("re:zero"))
+
+    def test_planner_agrees_with_scan(self) -> None:
+        library: Library = Library()
+        library.add_books(FIELD_BOOKS)
+
+        for query in FIELD_QUERIES:
+            terms:    list[Term] = parse(query)
+            expected: list[Book] = [book for book in FIELD_BOOKS
+                                    if all(term.matches(book) for term in terms)]
+
+            with self.subTest(query=query):
+                self.assertEqual(library.query(query), expected)
+
+    def test_planner_after_changes(self) -> None:
+        library: Library = Library()
+        library.add_books(FIELD_BOOKS)
+
+        library.remove_book(FIELD_BOOKS[10])
+        library.edit_book(FIELD_BOOKS[11], Book("Night Edit", "Ana River", FIELD_BOOKS[11].isbn,
+                                                year="1960", publisher="Publisher 1"))
+
+        self.assertNotIn(FIELD_BOOKS[10], library.query("year:1950"))
+        self.assertEqual([book.title for book in library.query("publisher:publisher title:edit")],
+                         ["Night Edit"])
+
+class TestSortedIndex(unittest.TestCase):
+    def test_chunks_split_and_empty(self) -> None:
+        sorted_index: SortedIndex = SortedIndex()
+
+        # Small chunks, so that a few entries are enough to split and empty them
+        with mock.patch.object(indexes, "CHUNK_SIZE", 4):
+            for book_id, key in enumerate((7 * i) % 50 for i in range(50)):
+                sorted_index.add(key, book_id)
+                sorted_index.flush()
+
+            self.assertGreater(len(sorted_index.chunks), 5)
+            self.assertTrue(all(len(chunk) <= 8 for chunk in sorted_index.chunks))
+
+            entries: list[tuple[int, int]] = [entry for chunk in sorted_index.chunks
+                                              for entry in chunk]
+
+            self.assertEqual(entries, sorted(entries))
+            self.assertEqual(sorted_index.maxes, [chunk[-1] for chunk in sorted_index.chunks])
+
+            for key, book_id in entries[:40]:
+                sorted_index.remove(key, book_id)
+
+        self.assertEqual(len(sorted_index), 10)
+        self.assertEqual(list(sorted_index.ids(0, 10)), [book_id for _, book_id in entries[40:]])
+        self.assertEqual(list(sorted_index.ids(2, 5, reverse=True)),
+                         [book_id for _, book_id in reversed(entries[42:45])])
+
+    def test_bounds(self) -> None:
+        sorted_index: SortedIndex = SortedIndex()
+
+        # More entries than INSORT_LIMIT, so they're sorted in bulk
+        sorted_index.add_many((year, book_id) for book_id, year in
+                              enumerate(1900 + (13 * i) % 100 for i in range(100)))
+
+        for low, high in ((None, None), (1950, 1959), (None, 1910), (1990, None), (1960, 1950)):
+            start, stop = sorted_index.bounds(low, high)
+            expected: int = sum(1 for i in range(100) if (low is None or 1900 + i >= low) and
+                                (high is None or 1900 + i <= high))
+
+            with self.subTest(low=low, high=high):
+                self.assertEqual(stop - start, expected)
+
+        words: SortedIndex = SortedIndex()
+        words.add_many((word, book_id) for book_id, word in
+                       enumerate(["band", "apple", "banana", "cherry", "apricot", "ban"]))
+
+        start, stop = words.prefix_bounds("ban")
+        self.assertEqual(list(words.ids(start, stop)), [5, 2, 0])
+
+        start, stop = words.prefix_bounds("ap")
+        self.assertEqual(list(words.ids(start, stop, reverse=True)), [4, 1])
+
+        self.assertEqual(words.prefix_bounds("zebra")[0], words.prefix_bounds("zebra")[1])
+
+class TestStream(TempDirTestCase):
+    def test_json_array_in_small_chunks(self) -> None:
+        records: list[dict] = [book.to_dict() for book in BOOKS]
+        records[0]["title"] = 'The "Night" [Garden], {1}'
+
+        text: str = json.dumps(records, indent=4, ensure_ascii=False)
+
+        for chunk_size in (1, 7, 64, 1 << 16):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_json_array(io.StringIO(text), chunk_size)), records)
+
+        self.assertEqual(list(iter_json_array(io.StringIO(" [ ] "))), [])
+
+        for broken in ("", "{}", '[{"title": "A"}', '[{"title": "A"} {"title": "B"}]'):
+            with self.subTest(broken=broken), self.assertRaises(json.JSONDecodeError):
+                list(iter_json_array(io.StringIO(broken)))
+
+    def test_records_round_trip(self) -> None:
+        records:    list[dict] = [book.to_dict() for book in BOOKS]
+        array_path: Path       = self.dir / "books.json"
+        lines_path: Path       = self.dir / "books.jsonl"
+
+        self.assertEqual(write_json_array(records, array_path), len(records))
+
+        with open(array_path, 'r', encoding="utf-8") as json_file:
+            self.assertEqual(json_file.read(), json.dumps(records, indent=4))
+
+        lines_path.write_text("\n".join(json.dumps(record) for record in records) + "\n",
+                              encoding="utf-8")
+
+        self.assertEqual(list(iter_records(array_path)), records)
+        self.assertEqual(list(iter_records(lines_path)), records)
+
+        with self.assertRaises(FileNotFoundError):
+            iter_records(self.dir / "missing.json")
+
+    def test_csv(self) -> None:
+        csv_path: Path = self.dir / "books.csv"
+        csv_path.write_text("isbn,title,author,year,publisher\n"
+                            "1,Night Garden,Ana River,1990,\n"
+                            "\n"
+                            '2,"Café, Stories",Jean Dupont\n', encoding="utf-8")
+
+        records: list[dict] = list(iter_csv(csv_path))
+
+        self.assertEqual([Book(**record) for record in records],
+                         [Book("Night Garden", "Ana River", "1", year="1990"),
+                          Book("Café, Stories", "Jean Dupont", "2")])
+        self.assertEqual(records[0]["publisher"], MISSING)
+
+        csv_path.write_text("title,year\nNight Garden,1990\n", encoding="utf-8")
+
+        with self.assertRaisesRegex(ValueError, "author, isbn"):
+            iter_csv(csv_path)
+
+class TestImport(unittest.TestCase):
+    def test_duplicates_and_conflicts(self) -> None:
+        library: Library = Library()
+        library.add_books(BOOKS[:2])
+
+        renamed: Book = Book("Another Title", BOOKS[1].author, BOOKS[1].isbn)
+        clash:   Book = Book("Clash", "Lee Park", BOOKS[3].isbn)
+
+        report = library.add_books([BOOKS[0], BOOKS[2], BOOKS[3].to_dict(), renamed, BOOKS[2],
+                                    clash])
+
+        self.assertEqual((report.read, report.added), (6, 2))
+        self.assertEqual(report.duplicates, [BOOKS[0].isbn, BOOKS[2].isbn])
+        self.assertEqual(report.conflicts, [BOOKS[1].isbn, BOOKS[3].isbn])
+        self.assertEqual(report.summary(), "Added 2 of 6 books. Skipped 2 duplicates. Skipped 2 "
+                                           f"conflicting ISBNs: {BOOKS[1].isbn}, {BOOKS[3].isbn}.")
+
+        # The first of any conflicting books is kept
+        self.assertEqual(list(library.books.values()), BOOKS[:4])
+
+class TestCache(unittest.TestCase):
+    def test_closest_prefix(self) -> None:
+        cache: QueryCache = QueryCache(capacity=2)
+
+        cache.put("ri", "fuzz", {1: 0, 2: 0, 3: 0})
+        cache.put("riv", "fuzz", {1: 0, 2: 0})
+
+        self.assertEqual(cache.closest("river", "fuzz"), {1: 0, 2: 0})
+        self.assertIsNone(cache.closest("river", "fuzz", max_size=1))
+        self.assertIsNone(cache.closest("river", "list"))
+        self.assertIsNone(cache.closest("ri", "fuzz"))
+        self.assertEqual(cache.refinements, 1)
+
+        # "ri" is now the least recently used entry, so it's evicted first
+        cache.put("night", "fuzz", {})
+        self.assertIsNone(cache.get("ri", "fuzz"))
+
+        cache.sync(1)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_refined_search_agrees_with_scan(self) -> None:
+        library: Library = Library()
+        library.add_books(FIELD_BOOKS + BOOKS)
+
+        for backend in ("fuzz", "list", "trigram"):
+            for query in ("ri", "riv", "river", "river 1", "caf", "café", "978", "978-0"):
+                scores:   dict[int, int] = library.scan(query, backend)
+                expected: list[Book]     = [library.books[book_id] for book_id in
+                                            sorted(scores, key=lambda i: (-scores[i], i))]
+
+                with self.subTest(backend=backend, query=query):
+                    self.assertEqual(library.search(query, backend), expected)
+
+        self.assertGreater(library.cache.refinements, 0)
+
+        # A change drops the cached results rather than refining stale ones
+        library.remove_book(BOOKS[0])
+        self.assertNotIn(BOOKS[0], library.search("river", "fuzz"))
+
+class TestDatabase(TempDirTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.database: DatabaseLibrary = DatabaseLibrary(self.dir / "library.db")
+        self.addCleanup(self.database.close)
+
+        self.database.add_books(BOOKS + [Book("Le Cœur", "Émile Roux", "978-2-07-036822-8",
+                                              publisher="Éditions Gallimard")])
+
+    def test_query_matches_accented_text(self) -> None:
+        for query in ("café", "Café", "cafe", "CAFÉ", "title:café", "title:cafe stories"):
+            with self.subTest(query=query):
+                self.assertEqual(self.database.query(query), [BOOKS[1]])
+
+        for query in ("publisher:éditions", "publisher:editions", "émile", "author:emile"):
+            with self.subTest(query=query):
+                self.assertEqual([book.title for book in self.database.query(query)], ["Le Cœur"])
+
+        self.assertEqual(self.database.query("šimić"), [BOOKS[5]])
+        self.assertEqual(self.database.query("東京"), [BOOKS[4]])
+
+    def test_changes(self) -> None:
+        self.assertEqual(len(self.database), len(BOOKS) + 1)
+        self.assertEqual(self.database.book_by_isbn(BOOKS[2].isbn), BOOKS[2])
+        self.assertEqual(self.database.books_by_author("Ana River"), [BOOKS[0], BOOKS[3]])
+
+        revised: Book = Book("Winter Letters (revised)", "Ana River", BOOKS[3].isbn, year="2001")
+
+        self.database.edit_book(BOOKS[3], revised)
+        self.database.remove_book(BOOKS[0])
+
+        self.assertIsNone(self.database.book_by_isbn(BOOKS[0].isbn))
+        self.assertEqual(self.database.books_by_author("Ana River"), [revised])
+        self.assertEqual(self.database.query("year:2001"), [revised])
+        self.assertEqual(self.database.listing()[:2], [BOOKS[1], BOOKS[2]])
+
+    def test_query_agrees_with_library(self) -> None:
+        library: Library = Library()
+        library.add_books(self.database.listing()[:])
+
+        for query in ("river", "ana river", "author:river", "title:naive", "isbn:978-2-07",
+                      "9782070", "isbn:0004", "publisher:gallimard", "naïve kingdom", "zzzz"):
+            with self.subTest(query=query):
+                self.assertEqual(self.database.query(query), library.query(query))
+
+class TestCommands(TempDirTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.file_path: Path = self.dir / "library.json"
+
+        write_json_array((book.to_dict() for book in BOOKS), self.file_path)
+
+    def run_command(self, *arguments: str) -> tuple[int, list[str]]:
+        """
+        Returns the exit status of a command and the ISBNs it printed.
+        """
+
+        output: io.StringIO = io.StringIO()
+
+        with redirect_stdout(output), redirect_stderr(io.StringIO()):
+            status: int = commands.main(["--file", str(self.file_path), *arguments],
+                                        self.file_path)
+
+        return status, [line.split("\t")[2] for line in output.getvalue().splitlines()]
+
+    def test_streamed_file(self) -> None:
+        self.assertEqual(self.run_command("lookup", BOOKS[4].isbn), (0, [BOOKS[4].isbn]))
+        self.assertEqual(self.run_command("lookup", "0"), (1, []))
+        self.assertEqual(self.run_command("search", "zzzz"), (1, []))
+
+        status, isbns = self.run_command("search", "ana", "river", "--limit", "1")
+
+        self.assertEqual((status, len(isbns)), (0, 1))
+        self.assertIn(isbns[0], (BOOKS[0].isbn, BOOKS[3].isbn))
+
+    def test_snapshot_agrees_with_file(self) -> None:
+        streamed: list[tuple[int, list[str]]] = [self.run_command("search", query)
+                                                 for query in QUERIES]
+
+        write_snapshot(BOOKS, self.file_path.with_suffix(".snap"))
+
+        self.assertIsInstance(commands.open_source(self.file_path), Snapshot)
+        self.assertEqual([self.run_command("search", query) for query in QUERIES], streamed)
+        self.assertEqual(self.run_command("lookup", BOOKS[5].isbn), (0, [BOOKS[5].isbn]))
+
+    def test_errors(self) -> None:
+        self.assertEqual(self.run_command("--file", str(self.dir / "missing.json"),
+                                          "lookup", "1")[0], 2)
+
+        self.file_path.write_text('[{"title": "A", "author": "B", "isbn": "1", "colour": "red"}]',
+                                  encoding="utf-8")
+        self.assertEqual(self.run_command("lookup", "1"), (2, []))
+
+        self.file_path.write_text('[{"title": "A", "author": "B", "isbn": "1"',
+                                  encoding="utf-8")
+        self.assertEqual(self.run_command("search", "a"), (2, []))
+
+class TestJournal(TempDirTestCase):
+    def test_replay_discards_torn_tail(self) -> None:
+        journal_path: Path    = self.dir / "library.journal"
+        journal:      Journal = Journal(journal_path)
+
+        journal.append("add", book=BOOKS[0].to_dict())
+        journal.append("add", book=BOOKS[1].to_dict())
+
+        complete: int = journal_path.stat().st_size
+
+        # A crash part way through writing the third entry
+        with open(journal_path, 'ab') as journal_file:
+            journal_file.write(b'{"op": "add", "book": {"title": "Torn')
+
+        entries: list[dict] = list(Journal(journal_path).replay())
+
+        self.assertEqual([entry["book"]["isbn"] for entry in entries],
+                         [BOOKS[0].isbn, BOOKS[1].isbn])
+        self.assertEqual(journal_path.stat().st_size, complete)
+
+    def test_library_replays_journal(self) -> None:
+        file_path: Path    = self.dir / "library.json"
+        library:   Library = Library(file_path)
+
+        library.open_journal(file_path)
+        library.add_book(BOOKS[0])
+        library.add_book(BOOKS[1])
+
+        with open(file_path.with_suffix(".journal"), 'ab') as journal_file:
+            journal_file.write(b'{"op": "remove", "is')
+
+        reopened: Library = Library(file_path)
+        reopened.open_journal(file_path)
+
+        self.assertEqual(reopened.book_by_isbn(BOOKS[0].isbn), BOOKS[0])
+        self.assertEqual(reopened.book_by_isbn(BOOKS[1].isbn), BOOKS[1])
+
+class TestMerge(TempDirTestCase):
+    def test_three_way_merge(self) -> None:
+        file_path: Path = self.dir / "library.json"
+
+        initial: Library = Library()
+        initial.add_books(BOOKS)
+        initial.update_file(file_path)
+
+        ours:   Library = Library(file_path)
+        theirs: Library = Library(file_path)
+        ours.load_file(file_path)
+        theirs.load_file(file_path)
+
+        # Each session changes a different book, and both change the same one
+        theirs.edit_book(BOOKS[0], Book("Night Garden (2nd ed.)", "Ana River", BOOKS[0].isbn))
+        theirs.remove_book(BOOKS[2])
+        theirs.edit_book(BOOKS[3], Book("Their Letters", "Ana River", BOOKS[3].isbn))
+        theirs.add_book(Book("New Arrival", "Lee Park", "9780000000007"))
+        theirs.update_file(file_path)
+
+        ours.edit_book(BOOKS[1], Book("Café Stories (revised)", "Jean Dupont", BOOKS[1].isbn))
+        ours.edit_book(BOOKS[3], Book("Our Letters", "Ana River", BOOKS[3].isbn))
+
+        with ours.shared():
+            changed: int = ours.merge_file()
+
+        self.assertEqual(changed, 3)
+        self.assertEqual(ours.book_by_isbn(BOOKS[0].isbn).title, "Night Garden (2nd ed.)")
+        self.assertIsNone(ours.book_by_isbn(BOOKS[2].isbn))
+        self.assertEqual(ours.book_by_isbn("9780000000007").title, "New Arrival")
+        self.assertEqual(ours.book_by_isbn(BOOKS[1].isbn).title, "Café Stories (revised)")
+        self.assertEqual(ours.book_by_isbn(BOOKS[3].isbn).title, "Our Letters")
+
+        # Merged books are indexed like any other
+        self.assertEqual([book.isbn for book in ours.search_dict("2nd ed")], [BOOKS[0].isbn])
+
+class TestSnapshot(TempDirTestCase):
+    def test_round_trip(self) -> None:
+        snapshot_path: Path = self.dir / "library.snap"
+
+        write_snapshot(BOOKS, snapshot_path)
+        snapshot: Snapshot = Snapshot(snapshot_path)
+        self.addCleanup(snapshot.close)
+
+        self.assertEqual(len(snapshot), len(BOOKS))
+        self.assertEqual(list(snapshot), BOOKS)
+        self.assertEqual(snapshot.book_by_isbn(BOOKS[4].isbn), BOOKS[4])
+        self.assertIsNone(snapshot.book_by_isbn("0"))
+        self.assertEqual(snapshot.books_by_author("Ana River"), [BOOKS[0], BOOKS[3]])
+        self.assertEqual(snapshot.books_by_title("Café Stories"), [BOOKS[1]])
+
+    def test_rewrite_keeps_open_snapshot(self) -> None:
+        snapshot_path: Path = self.dir / "library.snap"
+
+        write_snapshot(BOOKS, snapshot_path)
+        snapshot: Snapshot = Snapshot(snapshot_path)
+        self.addCleanup(snapshot.close)
+
+        write_snapshot(BOOKS[:2], snapshot_path)
+
+        rewritten: Snapshot = Snapshot(snapshot_path)
+        self.addCleanup(rewritten.close)
+
+        # The open snapshot still maps the file it was opened on
+        self.assertEqual(list(snapshot), BOOKS)
+        self.assertEqual(list(rewritten), BOOKS[:2])
+
+if __name__ == "__main__":
+    unittest.main()